@@ -0,0 +1,285 @@
+"""Quality Path 번역을 위해 자막 텍스트를 토큰 예산 단위로 나누고 다시 합치는 스크립트
+
+extract_subtitle_text.py 결과(subtitle_texts.json)를 문장 끝과 장면 경계(긴 자막 간격)에서
+나누어, 각 청크가 번역 모델의 컨텍스트 창에 들어가도록 합니다.
+
+- 각 청크는 앞 청크의 마지막 몇 항목을 문맥용 overlap으로 함께 가집니다.
+- video_context.md의 Key Terminology 표에서 청크에 등장하는 용어만 glossary로 붙입니다.
+- stitch는 청크별 번역에서 overlap 항목을 제거하고 원래 순서로 이어 붙입니다.
+  청크를 병렬로 번역해도 결과는 항상 같습니다.
+"""
+import os
+import re
+import sys
+import json
+import math
+import argparse
+
+DEFAULT_MAX_TOKENS = 1500
+DEFAULT_OVERLAP = 2
+DEFAULT_SCENE_GAP_MS = 2000
+SENTENCE_ENDINGS = ('.', '?', '!', '…', '."', '?"', '!"')
+
+_TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-{2,}')
+
+
+def estimate_tokens(text):
+    """
+    텍스트의 토큰 수를 대략 계산합니다.
+    영문은 약 4글자당 1토큰, 한글 등 비ASCII 문자는 1글자당 1토큰으로 봅니다.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars) + 1
+
+
+def load_glossary(context_path):
+    """
+    video_context.md의 'Key Terminology' 섹션 표에서 용어집을 읽습니다.
+
+    Returns:
+        list: [[영문 용어, 번역], ...]
+    """
+    if not context_path or not os.path.exists(context_path):
+        return []
+
+    glossary = []
+    in_section = False
+    header_skipped = False
+    with open(context_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith('#'):
+                in_section = 'terminology' in stripped.lower()
+                header_skipped = False
+                continue
+            if not in_section or not stripped.startswith('|'):
+                continue
+            if _TABLE_SEPARATOR_RE.match(stripped):
+                continue
+            cells = [cell.strip() for cell in stripped.strip('|').split('|')]
+            if not header_skipped:
+                # 첫 행은 표 머리글
+                header_skipped = True
+                continue
+            if len(cells) >= 2 and cells[0] and cells[1]:
+                glossary.append([cells[0], cells[1]])
+
+    return glossary
+
+
+def _relevant_glossary(glossary, texts):
+    joined = ' '.join(texts).lower()
+    return [entry for entry in glossary if entry[0].lower() in joined]
+
+
+def _glossary_tokens(entries):
+    """청크에 붙는 용어집 항목("용어: 번역")의 토큰 수"""
+    return sum(estimate_tokens(f"{term}: {translation}") for term, translation in entries)
+
+
+def chunk_segments(texts, timings=None, max_tokens=DEFAULT_MAX_TOKENS,
+                   overlap=DEFAULT_OVERLAP, scene_gap_ms=DEFAULT_SCENE_GAP_MS, glossary=None):
+    """
+    자막 텍스트를 토큰 예산 안에서 장면/문장 경계를 따라 나눕니다.
+
+    예산을 넘기 직전에 청크 후반부에 장면 경계가 있으면 거기서, 없으면 마지막 문장 끝에서,
+    둘 다 없으면 현재 위치에서 자릅니다.
+
+    Args:
+        texts (list): 자막 텍스트 리스트
+        timings (list): [[시작 ms, 종료 ms], ...] (없으면 장면 경계를 사용하지 않음)
+        max_tokens (int): 청크당 최대 토큰 수 (overlap과 glossary 포함)
+        overlap (int): 앞 청크에서 문맥으로 가져올 최대 항목 수
+                       (overlap과 첫 항목이 max_tokens에 들어가도록 줄어듭니다)
+        scene_gap_ms (int): 이 간격 이상이면 장면 경계로 봅니다
+        glossary (list): load_glossary() 결과
+
+    Returns:
+        list: [{
+            'index': int,
+            'start': int,          # 이 청크가 담당하는 첫 항목 (포함)
+            'end': int,            # 담당 마지막 항목 (미포함)
+            'overlap_start': int,  # texts[overlap_start:start]는 문맥용
+            'texts': list,         # texts[overlap_start:end]
+            'glossary': list,
+            'tokens': int          # texts와 glossary의 토큰 수 합계
+        }, ...]
+    """
+    glossary = glossary or []
+    tokens = [estimate_tokens(text) for text in texts]
+
+    def is_scene_break(i):
+        return (timings is not None and i + 1 < len(timings) and
+                timings[i + 1][0] - timings[i][1] >= scene_gap_ms)
+
+    def is_sentence_end(i):
+        return texts[i].rstrip().endswith(SENTENCE_ENDINGS)
+
+    def glossary_tokens(start, end):
+        return _glossary_tokens(_relevant_glossary(glossary, texts[start:end]))
+
+    boundaries = []
+    start = 0
+    while start < len(texts):
+        # overlap은 문맥용이므로 담당 항목 하나와 그 용어집이 들어갈 자리를 남기고 줄입니다.
+        overlap_start = max(0, start - overlap) if boundaries else start
+        first_item = tokens[start] + glossary_tokens(start, start + 1)
+        while (overlap_start < start and
+               sum(tokens[overlap_start:start]) + first_item > max_tokens):
+            overlap_start += 1
+        budget = max_tokens - sum(tokens[overlap_start:start])
+        used = 0
+        last_scene = last_sentence = None
+        end = start
+
+        while end < len(texts) and (
+                end == start or used + tokens[end] + glossary_tokens(start, end + 1) <= budget):
+            used += tokens[end]
+            if is_scene_break(end):
+                last_scene = end + 1
+            if is_sentence_end(end):
+                last_sentence = end + 1
+            end += 1
+
+        if end < len(texts):
+            midpoint = start + (end - start) // 2
+            if last_scene is not None and last_scene > midpoint:
+                end = last_scene
+            elif last_sentence is not None:
+                end = last_sentence
+            elif last_scene is not None:
+                end = last_scene
+
+        boundaries.append((overlap_start, start, end))
+        start = end
+
+    chunks = []
+    for index, (overlap_start, start, end) in enumerate(boundaries):
+        chunk_glossary = _relevant_glossary(glossary, texts[start:end])
+        chunks.append({
+            'index': index,
+            'start': start,
+            'end': end,
+            'overlap_start': overlap_start,
+            'texts': texts[overlap_start:end],
+            'glossary': chunk_glossary,
+            'tokens': sum(tokens[overlap_start:end]) + _glossary_tokens(chunk_glossary),
+        })
+
+    return chunks
+
+
+def stitch_chunks(chunks, chunk_translations):
+    """
+    청크별 번역 결과를 원래 순서로 합칩니다. overlap 항목의 번역은 버립니다.
+
+    Args:
+        chunks (list): chunk_segments() 결과
+        chunk_translations (dict or list): 청크 index → 청크 texts와 같은 길이의 번역 리스트
+
+    Returns:
+        list: 전체 번역 리스트
+
+    Raises:
+        ValueError: 청크 번역이 없거나 개수가 맞지 않거나 청크가 연속되지 않을 때
+    """
+    if isinstance(chunk_translations, list):
+        chunk_translations = dict(enumerate(chunk_translations))
+
+    stitched = []
+    for chunk in sorted(chunks, key=lambda c: c['start']):
+        if chunk['start'] != len(stitched):
+            raise ValueError(f"청크 {chunk['index']}의 시작 위치가 연속되지 않습니다.")
+
+        translated = chunk_translations.get(chunk['index'])
+        if translated is None:
+            raise ValueError(f"청크 {chunk['index']}의 번역이 없습니다.")
+        if len(translated) != len(chunk['texts']):
+            raise ValueError(
+                f"청크 {chunk['index']} 개수 불일치: 원문 {len(chunk['texts'])}개 vs 번역 {len(translated)}개"
+            )
+
+        skip = chunk['start'] - chunk['overlap_start']
+        stitched.extend(translated[skip:])
+
+    return stitched
+
+
+def _load_chunk_translations(path):
+    """번역 JSON 파일(리스트의 리스트) 또는 chunk_XXX.json 파일이 있는 디렉토리를 읽습니다."""
+    if not os.path.isdir(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    translations = {}
+    for name in os.listdir(path):
+        match = re.match(r'^chunk_(\d+)\.json$', name)
+        if match:
+            with open(os.path.join(path, name), 'r', encoding='utf-8') as f:
+                translations[int(match.group(1))] = json.load(f)
+    return translations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="번역용 자막 청크 분할/병합")
+    subparsers = parser.add_subparsers(dest='command')
+
+    chunk_parser = subparsers.add_parser('chunk', help="subtitle_texts.json을 청크로 나눕니다")
+    chunk_parser.add_argument('subtitle_texts')
+    chunk_parser.add_argument('--context', help="video_context.md (용어집)")
+    chunk_parser.add_argument('--max-tokens', type=int, default=DEFAULT_MAX_TOKENS)
+    chunk_parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP)
+    chunk_parser.add_argument('--scene-gap-ms', type=int, default=DEFAULT_SCENE_GAP_MS)
+
+    stitch_parser = subparsers.add_parser('stitch', help="청크별 번역을 하나로 합칩니다")
+    stitch_parser.add_argument('chunks_json')
+    stitch_parser.add_argument('chunk_translations', help="리스트의 리스트 JSON 또는 chunk_XXX.json 디렉토리")
+    stitch_parser.add_argument('output_json')
+
+    args = parser.parse_args()
+
+    if args.command == 'chunk':
+        with open(args.subtitle_texts, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        glossary = load_glossary(args.context)
+        chunks = chunk_segments(
+            data['texts'], data.get('timings'),
+            max_tokens=args.max_tokens,
+            overlap=args.overlap,
+            scene_gap_ms=args.scene_gap_ms,
+            glossary=glossary,
+        )
+        print(f"✓ {len(data['texts'])}개 항목을 {len(chunks)}개 청크로 나눴습니다. "
+              f"(용어집 {len(glossary)}개)", file=sys.stderr)
+        print(json.dumps({
+            'chunks': chunks,
+            'metadata': {
+                'total_count': len(data['texts']),
+                'chunk_count': len(chunks),
+                'max_tokens': args.max_tokens,
+                'overlap': args.overlap,
+            }
+        }, indent=2, ensure_ascii=False))
+
+    elif args.command == 'stitch':
+        with open(args.chunks_json, 'r', encoding='utf-8') as f:
+            chunks = json.load(f)['chunks']
+        try:
+            translated = stitch_chunks(chunks, _load_chunk_translations(args.chunk_translations))
+        except ValueError as e:
+            print(f"오류: {e}", file=sys.stderr)
+            print(json.dumps({'success': False, 'error': str(e)}, indent=2, ensure_ascii=False))
+            sys.exit(1)
+
+        with open(args.output_json, 'w', encoding='utf-8') as f:
+            json.dump(translated, f, ensure_ascii=False, indent=2)
+        print(f"✓ 번역 병합 완료: {args.output_json}", file=sys.stderr)
+        print(json.dumps({
+            'success': True,
+            'subtitle_count': len(translated),
+            'output_path': args.output_json,
+        }, indent=2, ensure_ascii=False))
+
+    else:
+        parser.print_help(sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,343 @@
+"""여러 YouTube 영상을 동시에 다운로드하는 관리자 스크립트
+
+download_youtube.py의 download_video_and_subtitles()를 감싸서
+- yt-dlp 조각(fragment) 동시 다운로드와 HTTP 범위 요청 청크 크기를 설정하고
+- 동시에 진행되는 모든 다운로드가 하나의 대역폭 예산과 하나의 미디어 캐시를 나눠 쓰며
+- 중단된 다운로드는 .part 파일에서 이어 받고
+- 다운로드별 처리량(바이트, 소요 시간, 평균/최고 속도)을 기록합니다.
+
+대역폭 예산은 yt-dlp progress hook에서 받은 바이트만큼 공유 토큰 버킷을 소모하는 방식이므로
+HTTP 단일 파일, HLS/DASH 조각 다운로드 모두에 적용됩니다. 이어 받은 양은 yt-dlp와 같은 기준,
+즉 다운로드 시작 전에 남아 있던 .part 파일 크기로 계산합니다.
+"""
+import os
+import re
+import sys
+import json
+import time
+import glob
+import shutil
+import asyncio
+import argparse
+import threading
+
+from download_youtube import download_video_and_subtitles
+from media_cache import extract_video_id, resolve_cache
+
+DEFAULT_CONCURRENT_FRAGMENTS = 4
+DEFAULT_HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+DEFAULT_RETRIES = 10
+
+_SIZE_RE = re.compile(r'^\s*([\d.]+)\s*([KMG]?)i?B?\s*$', re.IGNORECASE)
+
+
+def parse_size(value):
+    """'10M', '512K', '1.5G' 같은 크기 문자열을 바이트 수로 변환합니다."""
+    if value is None:
+        return None
+    match = _SIZE_RE.match(str(value))
+    if not match:
+        raise ValueError(f"크기 형식을 해석할 수 없습니다: {value}")
+    number, unit = match.groups()
+    return int(float(number) * {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}[unit.upper()])
+
+
+class BandwidthBudget:
+    """
+    여러 다운로드 스레드가 공유하는 대역폭 예산 (스레드 안전 토큰 버킷).
+
+    Args:
+        bytes_per_second (int): 전체 다운로드 속도 상한 (None이면 무제한)
+    """
+
+    def __init__(self, bytes_per_second=None):
+        self.rate = bytes_per_second
+        self.capacity = bytes_per_second
+        self.tokens = bytes_per_second or 0
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, nbytes):
+        """nbytes만큼 예산을 사용합니다. 예산이 부족하면 그만큼 기다립니다."""
+        if not self.rate or nbytes <= 0:
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= nbytes
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+def part_file_sizes(directories):
+    """
+    디렉토리들에 남아 있는 .part 파일 크기를 읽습니다.
+    yt-dlp(continuedl)는 이 크기부터 이어 받으므로 이어 받은 바이트 수가 됩니다.
+
+    Returns:
+        dict: {절대 경로: 바이트 수}
+    """
+    sizes = {}
+    for directory in directories:
+        for path in glob.glob(os.path.join(glob.escape(directory), '*.part')):
+            try:
+                sizes[os.path.abspath(path)] = os.path.getsize(path)
+            except OSError:
+                pass
+    return sizes
+
+
+class DownloadMetrics:
+    """
+    다운로드 하나의 처리량 기록 (progress hook에서 갱신)
+
+    Args:
+        url (str): 영상 URL
+        part_sizes (dict): 다운로드 시작 전 .part 파일 크기 (part_file_sizes() 결과)
+    """
+
+    def __init__(self, url, part_sizes=None):
+        self.url = url
+        self.part_sizes = part_sizes or {}
+        self.started = time.monotonic()
+        self.finished = None
+        self.downloaded_bytes = 0
+        self.resumed_bytes = 0
+        self.peak_speed = 0.0
+        self.files = 0
+        self._last_bytes = {}
+        self._lock = threading.Lock()
+
+    def update(self, d):
+        """
+        yt-dlp progress hook 이벤트를 반영합니다.
+
+        Returns:
+            int: 이번 이벤트에서 새로 받은 바이트 수
+        """
+        filename = d.get('tmpfilename') or d.get('filename')
+        current = d.get('downloaded_bytes') or 0
+
+        with self._lock:
+            if filename not in self._last_bytes:
+                # yt-dlp가 보고하는 양에는 이어 받은 .part 파일 크기가 포함되어 있습니다.
+                resumed = self.part_sizes.get(os.path.abspath(filename), 0) if filename else 0
+                self.resumed_bytes += resumed
+                self._last_bytes[filename] = resumed
+
+            delta = max(0, current - self._last_bytes[filename])
+            self._last_bytes[filename] = max(current, self._last_bytes[filename])
+            self.downloaded_bytes += delta
+
+            speed = d.get('speed') or 0.0
+            self.peak_speed = max(self.peak_speed, speed)
+            if d.get('status') == 'finished':
+                self.files += 1
+        return delta
+
+    def to_dict(self):
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return {
+            'url': self.url,
+            'downloaded_bytes': self.downloaded_bytes,
+            'resumed_bytes': self.resumed_bytes,
+            'elapsed_seconds': round(elapsed, 2),
+            'average_bytes_per_second': round(self.downloaded_bytes / elapsed) if elapsed > 0 else 0,
+            'peak_bytes_per_second': round(self.peak_speed),
+            'files': self.files,
+        }
+
+
+def tuned_options(concurrent_fragments=DEFAULT_CONCURRENT_FRAGMENTS,
+                  http_chunk_size=DEFAULT_HTTP_CHUNK_SIZE, retries=DEFAULT_RETRIES,
+                  use_aria2c=False, aria2c_rate=None):
+    """
+    다운로드 속도용 yt-dlp 옵션을 만듭니다.
+
+    Args:
+        concurrent_fragments (int): HLS/DASH 조각 동시 다운로드 수
+        http_chunk_size (int): HTTP 범위 요청 청크 크기 (스로틀링 회피)
+        retries (int): 요청/조각 재시도 횟수
+        use_aria2c (bool): aria2c가 설치되어 있으면 외부 다운로더로 사용
+        aria2c_rate (int): aria2c 사용 시 다운로드당 속도 상한 (bytes/s)
+
+    Returns:
+        dict: yt-dlp 옵션
+    """
+    options = {
+        'concurrent_fragment_downloads': concurrent_fragments,
+        'http_chunk_size': http_chunk_size,
+        'retries': retries,
+        'fragment_retries': retries,
+        'continuedl': True,  # .part 파일에서 이어 받기
+        'nopart': False,
+    }
+
+    if use_aria2c:
+        if shutil.which('aria2c'):
+            aria2c_args = ['-x', str(concurrent_fragments), '-s', str(concurrent_fragments),
+                           '-k', '1M', '--continue=true']
+            if aria2c_rate:
+                aria2c_args.append(f"--max-download-limit={aria2c_rate}")
+            options['external_downloader'] = {'default': 'aria2c'}
+            options['external_downloader_args'] = {'aria2c': aria2c_args}
+        else:
+            print("⚠ aria2c를 찾을 수 없어 yt-dlp 기본 다운로더를 사용합니다.", file=sys.stderr)
+
+    return options
+
+
+class DownloadManager:
+    """
+    여러 다운로드를 동시에 실행하고 대역폭 예산을 나눠 씁니다.
+
+    Args:
+        max_jobs (int): 동시에 진행할 다운로드 수
+        bandwidth (int): 전체 대역폭 상한 (bytes/s, None이면 무제한)
+        concurrent_fragments (int): 다운로드당 조각 동시 다운로드 수
+        http_chunk_size (int): HTTP 범위 요청 청크 크기
+        retries (int): 재시도 횟수
+        use_aria2c (bool): aria2c 외부 다운로더 사용 여부
+        cache_dir (str): 미디어 캐시 디렉토리 (media_cache.py). 모든 다운로드가 한 캐시 인스턴스를 공유합니다.
+    """
+
+    def __init__(self, max_jobs=2, bandwidth=None,
+                 concurrent_fragments=DEFAULT_CONCURRENT_FRAGMENTS,
+                 http_chunk_size=DEFAULT_HTTP_CHUNK_SIZE, retries=DEFAULT_RETRIES,
+                 use_aria2c=False, cache_dir=None):
+        if max_jobs < 1:
+            raise ValueError(f"동시 다운로드 수는 1 이상이어야 합니다: {max_jobs}")
+        self.max_jobs = max_jobs
+        self.budget = BandwidthBudget(bandwidth)
+        self.concurrent_fragments = concurrent_fragments
+        self.http_chunk_size = http_chunk_size
+        self.retries = retries
+        self.use_aria2c = use_aria2c
+        self.cache = resolve_cache(cache_dir)
+        self.metrics = []
+
+    def _job_options(self, metrics):
+        # aria2c는 progress hook을 거의 호출하지 않으므로 예산을 다운로드 수로 나눠 직접 전달합니다.
+        aria2c_rate = None
+        if self.use_aria2c and self.budget.rate:
+            aria2c_rate = self.budget.rate // self.max_jobs
+
+        options = tuned_options(self.concurrent_fragments, self.http_chunk_size,
+                                self.retries, self.use_aria2c, aria2c_rate)
+
+        def progress_hook(d):
+            if d.get('status') in ('downloading', 'finished'):
+                self.budget.consume(metrics.update(d))
+
+        options['progress_hooks'] = [progress_hook]
+        return options
+
+    def download_one(self, url, output_dir):
+        """
+        영상 하나를 다운로드합니다. (동기 호출, 다른 다운로드와 예산 공유)
+
+        Returns:
+            dict: download_video_and_subtitles() 결과 + 'download_metrics'
+        """
+        # 이어 받을 수 있는 .part 파일 위치: 캐시 미사용 시 output_dir, 사용 시 영상별 staging 디렉토리
+        directories = [output_dir]
+        video_id = extract_video_id(url)
+        if self.cache is not None and video_id:
+            directories.append(self.cache.staging_path(video_id))
+
+        metrics = DownloadMetrics(url, part_file_sizes(directories))
+        self.metrics.append(metrics)
+        try:
+            result = download_video_and_subtitles(
+                url, output_dir, ydl_overrides=self._job_options(metrics), cache=self.cache
+            )
+        finally:
+            metrics.finished = time.monotonic()
+
+        result['download_metrics'] = metrics.to_dict()
+        return result
+
+    async def download_all(self, jobs):
+        """
+        여러 다운로드를 max_jobs개씩 동시에 실행합니다.
+
+        Args:
+            jobs (list): [(url, output_dir), ...]
+
+        Returns:
+            list: 다운로드별 결과 (실패한 다운로드는 {'url', 'error'})
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_jobs)
+
+        async def run(url, output_dir):
+            async with semaphore:
+                try:
+                    return await loop.run_in_executor(None, self.download_one, url, output_dir)
+                except Exception as e:
+                    print(f"⚠ 다운로드 실패: {url}: {e}", file=sys.stderr)
+                    return {'url': url, 'error': str(e)}
+
+        return await asyncio.gather(*(run(url, output_dir) for url, output_dir in jobs))
+
+    def summary(self):
+        """모든 다운로드의 합계 처리량"""
+        total_bytes = sum(m.downloaded_bytes for m in self.metrics)
+        if not self.metrics:
+            return {'downloads': 0, 'downloaded_bytes': 0, 'elapsed_seconds': 0.0,
+                    'average_bytes_per_second': 0}
+        started = min(m.started for m in self.metrics)
+        finished = max(m.finished or time.monotonic() for m in self.metrics)
+        elapsed = finished - started
+        return {
+            'downloads': len(self.metrics),
+            'downloaded_bytes': total_bytes,
+            'elapsed_seconds': round(elapsed, 2),
+            'average_bytes_per_second': round(total_bytes / elapsed) if elapsed > 0 else 0,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 YouTube 영상 동시 다운로드")
+    parser.add_argument('projects_dir', help="영상별 프로젝트 디렉토리를 만들 상위 디렉토리")
+    parser.add_argument('urls', nargs='+')
+    parser.add_argument('--jobs', type=int, default=2, help="동시 다운로드 수")
+    parser.add_argument('--bandwidth', help="전체 대역폭 상한 (예: 20M = 20MiB/s)")
+    parser.add_argument('--fragments', type=int, default=DEFAULT_CONCURRENT_FRAGMENTS,
+                        help="다운로드당 조각 동시 다운로드 수")
+    parser.add_argument('--chunk-size', default='10M', help="HTTP 범위 요청 청크 크기")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--aria2c', action='store_true', help="aria2c 외부 다운로더 사용")
+    parser.add_argument('--cache-dir', help="미디어 캐시 디렉토리")
+    args = parser.parse_args()
+
+    try:
+        manager = DownloadManager(
+            max_jobs=args.jobs,
+            bandwidth=parse_size(args.bandwidth),
+            concurrent_fragments=args.fragments,
+            http_chunk_size=parse_size(args.chunk_size),
+            retries=args.retries,
+            use_aria2c=args.aria2c,
+            cache_dir=args.cache_dir,
+        )
+    except ValueError as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    jobs = []
+    for i, url in enumerate(args.urls):
+        project_name = extract_video_id(url) or f"video_{i + 1}"
+        jobs.append((url, os.path.join(args.projects_dir, project_name)))
+
+    results = asyncio.run(manager.download_all(jobs))
+
+    print("\n" + "="*60)
+    print("METADATA_JSON_START")
+    print(json.dumps({'results': results, 'summary': manager.summary()}, indent=2, ensure_ascii=False))
+    print("METADATA_JSON_END")
+    print("="*60)
@@ -2,21 +2,37 @@
 import os
 import sys
 import json
+import shutil
 import yt_dlp
 
+import telemetry
+from media_cache import resolve_cache, extract_video_id
 
-def download_video_and_subtitles(url, output_dir="downloads"):
+VIDEO_FORMAT = 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best'
+SUBTITLE_LANGS = ['en', 'en-US', 'en-GB']
+
+
+@telemetry.traced('download')
+def download_video_and_subtitles(url, output_dir="downloads", cache_dir=None, ydl_overrides=None, cache=None):
     """
     YouTube 영상과 자막을 다운로드하고 메타데이터를 반환합니다.
 
+    cache_dir(또는 YT_KR_SUBTITLE_CACHE_DIR 환경 변수)가 지정되면 미디어 캐시를 사용하며,
+    이미 캐시된 영상은 네트워크 접근 없이 output_dir에 '<video_id>.mp4',
+    '<video_id>.<lang>.srt' 이름으로 배치됩니다.
+
     Args:
         url (str): YouTube 영상 URL
         output_dir (str): 다운로드할 디렉토리
+        cache_dir (str): 미디어 캐시 디렉토리 (None이면 환경 변수 확인, 없으면 캐시 미사용)
+        ydl_overrides (dict): 영상 다운로드에 추가할 yt-dlp 옵션 (download_manager.py에서 사용)
+        cache (MediaCache): 이미 연 캐시 (여러 다운로드가 한 인스턴스를 공유할 때, cache_dir보다 우선)
 
     Returns:
         dict: {
             'video_path': str,
             'subtitle_path': str or None,
+            'word_timing_path': str or None,   # 자동 자막 단어 타이밍 (json3)
             'title': str,
             'description': str,
             'duration': int,
@@ -25,17 +41,27 @@ def download_video_and_subtitles(url, output_dir="downloads"):
     """
     os.makedirs(output_dir, exist_ok=True)
 
+    if cache is None:
+        cache = resolve_cache(cache_dir)
+    if cache is not None:
+        try:
+            return _download_with_cache(url, output_dir, cache, ydl_overrides)
+        finally:
+            # 조회한 항목의 마지막 사용 시각을 한 번에 저장
+            cache.flush()
+
     # Step 1: 영상 다운로드
     video_opts = {
-        'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
+        'format': VIDEO_FORMAT,
         'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
         'merge_output_format': 'mp4',
         'quiet': False,
         'no_warnings': False,
     }
+    video_opts.update(ydl_overrides or {})
 
     print(f"[1/2] 영상 다운로드 시작: {url}")
-    with yt_dlp.YoutubeDL(video_opts) as ydl:
+    with telemetry.span('download.video', cache_enabled=False), yt_dlp.YoutubeDL(video_opts) as ydl:
         info = ydl.extract_info(url, download=True)
         video_path = ydl.prepare_filename(info)
 
@@ -48,13 +74,15 @@ def download_video_and_subtitles(url, output_dir="downloads"):
         }
 
     print(f"✓ 영상 다운로드 완료: {metadata['title']}")
+    if telemetry.enabled() and os.path.exists(video_path):
+        telemetry.count('bytes.written', os.path.getsize(video_path), stage='download')
 
     # Step 2: 자막 다운로드
     subtitle_opts = {
         'skip_download': True,
         'writesubtitles': True,
         'writeautomaticsub': True,
-        'subtitleslangs': ['en', 'en-US', 'en-GB'],
+        'subtitleslangs': SUBTITLE_LANGS,
         'subtitlesformat': 'srt',
         'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
         'quiet': False,
@@ -62,7 +90,7 @@ def download_video_and_subtitles(url, output_dir="downloads"):
 
     print("\n[2/2] 자막 다운로드 시도 중...")
     try:
-        with yt_dlp.YoutubeDL(subtitle_opts) as ydl:
+        with telemetry.span('download.subtitles'), yt_dlp.YoutubeDL(subtitle_opts) as ydl:
             sub_info = ydl.extract_info(url, download=True)
             base_filename = ydl.prepare_filename(sub_info)
             base_filename = os.path.splitext(base_filename)[0]
@@ -90,18 +118,195 @@ def download_video_and_subtitles(url, output_dir="downloads"):
         print(f"⚠ 자막 다운로드 실패: {e}")
         metadata['subtitle_path'] = None
 
+    word_timing = _download_word_timing(url, os.path.join(output_dir, '%(title)s.%(ext)s')) or {}
+    metadata['word_timing_path'] = next(iter(word_timing.values()), None)
+
+    return metadata
+
+
+def _download_word_timing(url, outtmpl):
+    """
+    자동 자막을 json3 형식(단어별 시작 시각 포함)으로 받습니다.
+    실패해도 전체 다운로드는 계속 진행합니다.
+
+    Returns:
+        dict or None: {lang: json3 파일 경로} (SUBTITLE_LANGS 순서), 다운로드 자체가 실패하면 None
+    """
+    word_timing_opts = {
+        'skip_download': True,
+        'writesubtitles': False,
+        'writeautomaticsub': True,
+        'subtitleslangs': SUBTITLE_LANGS,
+        'subtitlesformat': 'json3',
+        'outtmpl': outtmpl,
+        'quiet': True,
+    }
+
+    paths = {}
+    try:
+        with telemetry.span('download.word_timing'), yt_dlp.YoutubeDL(word_timing_opts) as ydl:
+            info = ydl.extract_info(url, download=True)
+            base_filename = os.path.splitext(ydl.prepare_filename(info))[0]
+
+        for lang in SUBTITLE_LANGS:
+            path = f"{base_filename}.{lang}.json3"
+            if os.path.exists(path):
+                paths[lang] = path
+    except Exception as e:
+        print(f"⚠ 단어 타이밍 다운로드 실패: {e}")
+        return None
+
+    if paths:
+        print(f"✓ 단어 타이밍 파일 발견: {next(iter(paths.values()))}")
+    return paths
+
+
+def _download_with_cache(url, output_dir, cache, ydl_overrides=None):
+    """미디어 캐시를 거쳐 영상과 자막을 준비합니다. (캐시에 없을 때만 다운로드)"""
+    video_id = extract_video_id(url)
+    video_key = cache.video_key(video_id, VIDEO_FORMAT) if video_id else None
+    video_entry = cache.get(video_key) if video_key else None
+
+    # Step 1: 영상 (캐시 확인 후 필요한 경우만 다운로드)
+    telemetry.current_span().set_attribute('cache_hit', video_entry is not None)
+    if video_entry is not None:
+        print(f"[1/2] 캐시된 영상 사용: {video_id}")
+    else:
+        print(f"[1/2] 영상 다운로드 시작: {url}")
+        # 영상별로 고정된 임시 디렉토리: 중단되면 다음 실행이 .part 파일에서 이어 받습니다.
+        resumable = video_id is not None
+        staging = cache.staging_dir(video_id)
+        video_opts = {
+            'format': VIDEO_FORMAT,
+            'outtmpl': os.path.join(staging, '%(id)s.%(ext)s'),
+            'merge_output_format': 'mp4',
+            'quiet': False,
+            'no_warnings': False,
+        }
+        video_opts.update(ydl_overrides or {})
+        try:
+            with telemetry.span('download.video', cache_enabled=True), yt_dlp.YoutubeDL(video_opts) as ydl:
+                info = ydl.extract_info(url, download=True)
+                downloaded_path = ydl.prepare_filename(info)
+            if telemetry.enabled():
+                telemetry.count('bytes.written', os.path.getsize(downloaded_path), stage='download')
+
+            video_id = info.get('id', video_id)
+            cache.put_video_info(video_id, {
+                'title': info.get('title', 'Unknown'),
+                'description': info.get('description', ''),
+                'duration': info.get('duration', 0),
+            })
+            video_key = cache.video_key(video_id, VIDEO_FORMAT)
+            video_entry = cache.put(video_key, downloaded_path, 'video', video_id,
+                                    format=VIDEO_FORMAT)
+        except Exception:
+            if resumable:
+                print(f"⚠ 영상 다운로드 중단: 받은 부분은 {staging}에 남겨 두고 다음에 이어 받습니다.")
+            else:
+                shutil.rmtree(staging, ignore_errors=True)
+            raise
+        shutil.rmtree(staging, ignore_errors=True)
+
+    info = cache.get_video_info(video_id) or {}
+    video_ext = os.path.splitext(video_entry['path'])[1]
+    video_path = os.path.join(output_dir, f"{video_id}{video_ext}")
+    method = cache.materialize(video_entry['path'], video_path)
+
+    metadata = {
+        'video_path': video_path,
+        'title': info.get('title', 'Unknown'),
+        'description': info.get('description', ''),
+        'duration': info.get('duration', 0),
+        'video_id': video_id
+    }
+    print(f"✓ 영상 준비 완료 ({method}): {metadata['title']}")
+
+    # Step 2: 자막 (이전에 확인한 영상이면 네트워크 접근 없음)
+    print("\n[2/2] 자막 확인 중...")
+    subtitle_entry = cache.find_subtitle(video_id, SUBTITLE_LANGS)
+
+    if subtitle_entry is None and not info.get('subtitles_checked'):
+        staging = cache.staging_dir()
+        subtitle_opts = {
+            'skip_download': True,
+            'writesubtitles': True,
+            'writeautomaticsub': True,
+            'subtitleslangs': SUBTITLE_LANGS,
+            'subtitlesformat': 'srt',
+            'outtmpl': os.path.join(staging, '%(id)s.%(ext)s'),
+            'quiet': False,
+        }
+        try:
+            with telemetry.span('download.subtitles'), yt_dlp.YoutubeDL(subtitle_opts) as ydl:
+                ydl.extract_info(url, download=True)
+
+            for lang in SUBTITLE_LANGS:
+                subtitle_file = os.path.join(staging, f"{video_id}.{lang}.srt")
+                if os.path.exists(subtitle_file):
+                    cache.put(cache.subtitle_key(video_id, lang), subtitle_file,
+                              'subtitle', video_id, lang=lang)
+            cache.put_video_info(video_id, {'subtitles_checked': True})
+            subtitle_entry = cache.find_subtitle(video_id, SUBTITLE_LANGS)
+        except Exception as e:
+            print(f"⚠ 자막 다운로드 실패: {e}")
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    if subtitle_entry is not None:
+        subtitle_path = os.path.join(output_dir, f"{video_id}.{subtitle_entry['lang']}.srt")
+        cache.materialize(subtitle_entry['path'], subtitle_path)
+        print(f"✓ 자막 파일 준비: {subtitle_path}")
+        metadata['subtitle_path'] = subtitle_path
+    else:
+        print("⚠ 자막 파일을 찾을 수 없습니다.")
+        metadata['subtitle_path'] = None
+
+    # 단어 타이밍 (자막과 따로 확인: 자막만 캐시된 영상도 단어 타이밍을 받습니다)
+    word_timing_entry = cache.find_word_timing(video_id, SUBTITLE_LANGS)
+    if word_timing_entry is None and not info.get('word_timing_checked'):
+        staging = cache.staging_dir()
+        try:
+            word_timing = _download_word_timing(url, os.path.join(staging, '%(id)s.%(ext)s'))
+            if word_timing is not None:
+                for lang, word_timing_file in word_timing.items():
+                    cache.put(cache.word_timing_key(video_id, lang), word_timing_file,
+                              'word_timing', video_id, lang=lang, format='json3')
+                # 자동 자막이 없는 영상은 다음에 다시 묻지 않습니다.
+                cache.put_video_info(video_id, {'word_timing_checked': True})
+                word_timing_entry = cache.find_word_timing(video_id, SUBTITLE_LANGS)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    if word_timing_entry is not None:
+        word_timing_path = os.path.join(output_dir, f"{video_id}.{word_timing_entry['lang']}.json3")
+        cache.materialize(word_timing_entry['path'], word_timing_path)
+        metadata['word_timing_path'] = word_timing_path
+    else:
+        metadata['word_timing_path'] = None
+
     return metadata
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python download_youtube.py <youtube_url> [output_dir]")
+    args = sys.argv[1:]
+    cache_dir = None
+    if '--cache-dir' in args:
+        flag_index = args.index('--cache-dir')
+        if flag_index + 1 >= len(args):
+            print("오류: --cache-dir 뒤에 디렉토리를 지정하세요.")
+            sys.exit(1)
+        cache_dir = args[flag_index + 1]
+        del args[flag_index:flag_index + 2]
+
+    if len(args) < 1:
+        print("Usage: python download_youtube.py <youtube_url> [output_dir] [--cache-dir <dir>]")
         sys.exit(1)
 
-    url = sys.argv[1]
-    output_dir = sys.argv[2] if len(sys.argv) > 2 else "downloads"
+    url = args[0]
+    output_dir = args[1] if len(args) > 1 else "downloads"
 
-    result = download_video_and_subtitles(url, output_dir)
+    result = download_video_and_subtitles(url, output_dir, cache_dir)
 
     # JSON 형식으로 결과 출력 (다른 스크립트에서 파싱 가능)
     print("\n" + "="*60)
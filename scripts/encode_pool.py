@@ -0,0 +1,363 @@
+"""여러 영상의 자막 합성(FFmpeg)을 CPU/메모리에 맞춰 동시에 실행하는 스크립트
+
+FFmpeg는 기본적으로 코어 수만큼 스레드를 쓰므로 여러 개를 그냥 동시에 실행하면
+스레드가 코어보다 훨씬 많아져 전체 처리량이 오히려 떨어집니다. EncodePool은
+- 코어 수(CPU affinity, cgroup 제한 반영)와 사용 가능한 메모리를 조사하고
+- 작업마다 스레드 예산(디코더/인코더 -threads, -filter_threads)을 정해
+- 남은 코어/메모리가 있을 때만 새 인코딩을 시작하고 나머지는 순서대로 대기시키며
+- 모든 작업의 FFmpeg 진행 상황(-progress)을 모아 전체 초당 프레임 수를 보고합니다.
+
+사용법:
+    python encode_pool.py run <jobs_json> [--threads N] [--no-admission] [--force]
+    python encode_pool.py bench [--jobs 4] [--duration 10] [--size 1280x720]
+
+jobs_json은 burn_subtitles() 인자 목록입니다:
+    [{"video_path": "...", "subtitle_path": "...", "output_path": "...", "font_size": 24}, ...]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from process_video import burn_subtitles, check_ffmpeg
+from media_probe import probe_media, generate_test_clip, MediaProbeError
+
+MEMORY_HEADROOM = 0.8          # 사용 가능한 메모리 중 인코딩에 쓸 비율
+JOB_BASE_MEMORY = 150 * 1024 ** 2
+FRAME_BUFFER_FRAMES = 60       # 인코더 lookahead + 필터 버퍼로 잡아 두는 프레임 수
+DEFAULT_FRAME_SIZE = (1920, 1080)
+STATUS_INTERVAL = 2.0
+
+
+def detect_cores():
+    """이 프로세스가 사용할 수 있는 코어 수 (CPU affinity와 cgroup v2 cpu.max 반영)"""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    try:
+        with open('/sys/fs/cgroup/cpu.max', 'r') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def detect_memory():
+    """사용 가능한 메모리 (bytes). 알 수 없으면 None"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_threads_per_job(cores):
+    """
+    작업당 스레드 수. 인코더는 스레드가 적을수록 효율이 좋아 코어의 1/4 정도(최소 2)를 줍니다.
+    같은 수가 디코더, 필터, 인코더에 각각 적용되지만 디코딩/자막 필터는 인코딩보다 훨씬 가벼워
+    동시 실행 판단에는 작업당 이 값만 셉니다.
+    """
+    return min(cores, max(2, cores // 4))
+
+
+def estimate_job_memory(video_path):
+    """영상 해상도로 작업 하나의 메모리 사용량을 대략 계산합니다."""
+    width, height = DEFAULT_FRAME_SIZE
+    try:
+        video = probe_media(video_path).get('video') or {}
+        width, height = video.get('width') or width, video.get('height') or height
+    except (OSError, MediaProbeError):
+        pass
+    # yuv420p 프레임 = width * height * 1.5 bytes
+    return JOB_BASE_MEMORY + int(width * height * 1.5 * FRAME_BUFFER_FRAMES)
+
+
+class EncodeMetrics:
+    """인코딩 작업 하나의 진행 기록 (FFmpeg progress 블록에서 갱신)"""
+
+    def __init__(self, output_path, threads):
+        self.output_path = output_path
+        self.threads = threads
+        self.queued = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.frames = 0
+        self.fps = 0.0
+
+    def update(self, block):
+        try:
+            self.frames = int(block.get('frame', self.frames))
+            self.fps = float(block.get('fps', self.fps))
+        except ValueError:
+            pass
+
+    def to_dict(self):
+        elapsed = (self.finished or time.monotonic()) - (self.started or self.queued)
+        return {
+            'output_path': self.output_path,
+            'threads': self.threads,
+            'queued_seconds': round((self.started or self.queued) - self.queued, 2),
+            'encode_seconds': round(elapsed, 2),
+            'frames': self.frames,
+            'average_fps': round(self.frames / elapsed, 1) if self.started and elapsed > 0 else 0.0,
+        }
+
+
+class EncodePool:
+    """
+    burn_subtitles() 작업을 코어/메모리 여유에 맞춰 동시에 실행합니다.
+
+    Args:
+        cores (int): 사용할 코어 수 (None이면 자동 조사)
+        memory_bytes (int): 사용할 수 있는 메모리 (None이면 자동 조사)
+        threads_per_job (int): 작업당 스레드 수 (None이면 코어 수로 결정)
+        admission (bool): False이면 제한 없이 모든 작업을 바로 시작하고 FFmpeg 기본 스레드를 사용
+                          (벤치마크 비교용)
+    """
+
+    def __init__(self, cores=None, memory_bytes=None, threads_per_job=None, admission=True):
+        self.cores = cores or detect_cores()
+        memory_bytes = memory_bytes or detect_memory()
+        self.memory_budget = int(memory_bytes * MEMORY_HEADROOM) if memory_bytes else None
+        self.threads_per_job = threads_per_job or default_threads_per_job(self.cores)
+        self.admission = admission
+        self.used_threads = 0
+        self.used_memory = 0
+        self.running = 0
+        self.metrics = []
+        self._queue = deque()
+        self._last_status = 0.0
+        self._lock = threading.Lock()
+
+    def _can_admit(self, ticket, memory):
+        # 대기열 순서대로 시작하며, 실행 중인 작업이 없으면 예산과 관계없이 하나는 시작합니다.
+        if self._queue[0] is not ticket:
+            return False
+        if self.running == 0:
+            return True
+        if self.used_threads + self.threads_per_job > self.cores:
+            return False
+        return self.memory_budget is None or self.used_memory + memory <= self.memory_budget
+
+    def aggregate_fps(self):
+        """실행 중인 작업들의 현재 초당 프레임 수 합계"""
+        with self._lock:
+            return round(sum(m.fps for m in self.metrics if m.started and not m.finished), 1)
+
+    def _progress(self, metrics):
+        def progress(block):
+            metrics.update(block)
+            now = time.monotonic()
+            with self._lock:
+                if now - self._last_status < STATUS_INTERVAL:
+                    return
+                self._last_status = now
+            print(f"  [pool] 실행 {self.running}개, 대기 {len(self._queue)}개, "
+                  f"전체 {self.aggregate_fps()} fps", file=sys.stderr)
+        return progress
+
+    def run_one(self, job, metrics):
+        """작업 하나를 실행합니다. (동기 호출)"""
+        metrics.started = time.monotonic()
+        try:
+            return burn_subtitles(
+                job['video_path'], job['subtitle_path'], job['output_path'],
+                job.get('font_name', "Arial"), job.get('font_size', 20),
+                target_height=job.get('target_height'),
+                encoder=job.get('encoder'),
+                force=job.get('force', False),
+                threads=metrics.threads,
+                progress=self._progress(metrics),
+            )
+        finally:
+            metrics.finished = time.monotonic()
+
+    async def run_all(self, jobs):
+        """
+        작업 목록을 실행합니다. admission이 켜져 있으면 여유가 생길 때까지 대기열에서 기다립니다.
+
+        Args:
+            jobs (list): burn_subtitles() 인자 dict 목록
+                         ({'video_path', 'subtitle_path', 'output_path', 'font_name', 'font_size', ...})
+
+        Returns:
+            list: 작업별 burn_subtitles() 결과 + 'encode_metrics'
+        """
+        loop = asyncio.get_running_loop()
+        condition = asyncio.Condition()
+        threads = self.threads_per_job if self.admission else None
+
+        async def run(job, executor):
+            metrics = EncodeMetrics(job['output_path'], threads)
+            with self._lock:
+                self.metrics.append(metrics)
+            memory = estimate_job_memory(job['video_path']) if self.admission else 0
+
+            ticket = object()
+            async with condition:
+                self._queue.append(ticket)
+                if self.admission:
+                    await condition.wait_for(lambda: self._can_admit(ticket, memory))
+                self._queue.remove(ticket)
+                self.running += 1
+                self.used_threads += threads or 0
+                self.used_memory += memory
+                condition.notify_all()
+
+            try:
+                result = await loop.run_in_executor(executor, self.run_one, job, metrics)
+            except Exception as e:
+                print(f"⚠ 인코딩 실패: {job['output_path']}: {e}", file=sys.stderr)
+                result = {'success': False, 'error': str(e), 'output_path': None}
+            finally:
+                async with condition:
+                    self.running -= 1
+                    self.used_threads -= threads or 0
+                    self.used_memory -= memory
+                    condition.notify_all()
+
+            result['encode_metrics'] = metrics.to_dict()
+            return result
+
+        # 대기는 이벤트 루프에서 하므로 스레드는 작업 수만큼만 있으면 됩니다.
+        with ThreadPoolExecutor(max_workers=max(1, len(jobs))) as executor:
+            return await asyncio.gather(*(run(job, executor) for job in jobs))
+
+    def summary(self):
+        """풀 전체 처리량"""
+        started = [m.started for m in self.metrics if m.started]
+        if not started:
+            return {'jobs': 0, 'frames': 0, 'elapsed_seconds': 0.0, 'aggregate_fps': 0.0}
+        first_queued = min(m.queued for m in self.metrics)
+        finished = max(m.finished or time.monotonic() for m in self.metrics)
+        elapsed = finished - first_queued
+        frames = sum(m.frames for m in self.metrics)
+        return {
+            'jobs': len(self.metrics),
+            'cores': self.cores,
+            'threads_per_job': self.threads_per_job if self.admission else None,
+            'admission': self.admission,
+            'frames': frames,
+            'elapsed_seconds': round(elapsed, 2),
+            'aggregate_fps': round(frames / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+
+def _write_bench_subtitles(path, duration):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(int(duration)):
+            f.write(f"{i + 1}\n00:00:{i:02d},000 --> 00:00:{i:02d},900\n벤치마크 자막 {i + 1}\n\n")
+    return path
+
+
+def benchmark(jobs=4, duration=10, size='1280x720', rate=25, encoder=None, work_dir=None):
+    """
+    같은 테스트 영상 N개를 제한 없이 동시 실행한 경우와 EncodePool 제한을 둔 경우의 처리량을 비교합니다.
+
+    Returns:
+        dict: {'input': {...}, 'unmanaged': summary(), 'admission': summary(), 'speedup': float}
+    """
+    cleanup = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix='encode_pool_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    try:
+        clip = generate_test_clip(os.path.join(work_dir, 'bench_input.mp4'), duration, size, rate)
+        subtitles = _write_bench_subtitles(os.path.join(work_dir, 'bench_input.srt'), duration)
+
+        results = {'input': {'jobs': jobs, 'duration': duration, 'size': size, 'rate': rate}}
+        for mode, admission in (('unmanaged', False), ('admission', True)):
+            print(f"\n[bench] {mode}: {jobs}개 작업 실행 중...", file=sys.stderr)
+            pool = EncodePool(admission=admission)
+            asyncio.run(pool.run_all([
+                {
+                    'video_path': clip,
+                    'subtitle_path': subtitles,
+                    'output_path': os.path.join(work_dir, f"bench_{mode}_{i}.mp4"),
+                    'encoder': encoder,
+                    'force': True,
+                }
+                for i in range(jobs)
+            ]))
+            results[mode] = pool.summary()
+
+        unmanaged_fps = results['unmanaged']['aggregate_fps']
+        results['speedup'] = round(results['admission']['aggregate_fps'] / unmanaged_fps, 2) if unmanaged_fps else None
+        return results
+    finally:
+        if cleanup:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU/메모리 여유에 맞춘 동시 자막 합성")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help="작업 목록 실행")
+    run_parser.add_argument('jobs_json', help="burn_subtitles() 인자 목록 JSON")
+    run_parser.add_argument('--threads', type=int, help="작업당 스레드 수 (기본값: 코어 수로 결정)")
+    run_parser.add_argument('--cores', type=int, help="사용할 코어 수 (기본값: 자동 조사)")
+    run_parser.add_argument('--memory-mb', type=int, help="사용할 메모리 MB (기본값: 자동 조사)")
+    run_parser.add_argument('--no-admission', action='store_true', help="제한 없이 모든 작업을 바로 시작")
+    run_parser.add_argument('--force', action='store_true', help="최신 출력 파일이 있어도 다시 인코딩")
+
+    bench_parser = subparsers.add_parser('bench', help="제한 유무에 따른 처리량 비교")
+    bench_parser.add_argument('--jobs', type=int, default=4)
+    bench_parser.add_argument('--duration', type=int, default=10, help="테스트 영상 길이 (초)")
+    bench_parser.add_argument('--size', default='1280x720', help="테스트 영상 해상도")
+    bench_parser.add_argument('--encoder', help="영상 인코더 (기본값: 자동 선택)")
+    bench_parser.add_argument('--work-dir', help="테스트 파일 디렉토리 (기본값: 임시 디렉토리, 끝나면 삭제)")
+
+    args = parser.parse_args()
+
+    if not check_ffmpeg():
+        print("오류: FFmpeg가 설치되어 있지 않습니다.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'bench':
+        result = benchmark(args.jobs, args.duration, args.size, encoder=args.encoder,
+                           work_dir=args.work_dir)
+    else:
+        with open(args.jobs_json, 'r', encoding='utf-8') as f:
+            jobs = json.load(f)
+        if args.force:
+            for job in jobs:
+                job['force'] = True
+
+        pool = EncodePool(
+            cores=args.cores,
+            memory_bytes=args.memory_mb * 1024 * 1024 if args.memory_mb else None,
+            threads_per_job=args.threads,
+            admission=not args.no_admission,
+        )
+        memory_budget = f"{pool.memory_budget // (1024 * 1024)}MB" if pool.memory_budget else "제한 없음"
+        print(f"코어 {pool.cores}개, 작업당 스레드 {pool.threads_per_job}개, 메모리 예산 {memory_budget}",
+              file=sys.stderr)
+        results = asyncio.run(pool.run_all(jobs))
+        result = {
+            'success': all(r['success'] for r in results),
+            'results': results,
+            'summary': pool.summary(),
+        }
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if args.command == 'run' and not result['success']:
+        sys.exit(1)
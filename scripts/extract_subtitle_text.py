@@ -1,9 +1,17 @@
 """SRT 자막 파일에서 텍스트만 추출하는 스크립트"""
+import os
 import sys
 import json
 import pysrt
 
+import telemetry
+from stage_profiler import maybe_profile
+from project_format import (
+    GROUPED, SOURCE, ProjectFile, is_project, update_project
+)
 
+
+@telemetry.traced('preprocess.fix_overlaps')
 def fix_overlapping_subtitles(subs):
     """
     겹치는 자막의 타임스탬프를 수정합니다.
@@ -21,12 +29,15 @@ def fix_overlapping_subtitles(subs):
             )
             fixed_count += 1
 
+    telemetry.count('cues.processed', len(subs), stage='fix_overlaps')
+    telemetry.current_span().set_attribute('fixed', fixed_count)
     if fixed_count > 0:
         print(f"✓ {fixed_count}개의 겹치는 자막 타임스탬프를 수정했습니다.", file=sys.stderr)
 
     return subs
 
 
+@telemetry.traced('preprocess.remove_short_duplicates')
 def remove_short_duplicates(subs, min_duration_ms=150):
     """150ms 미만의 짧고 중복된 자막을 제거합니다."""
     filtered_subs = pysrt.SubRipFile()
@@ -43,12 +54,15 @@ def remove_short_duplicates(subs, min_duration_ms=150):
         filtered_subs.append(sub)
         prev_text = sub.text
 
+    telemetry.count('cues.processed', len(subs), stage='remove_short_duplicates')
+    telemetry.current_span().set_attribute('removed', removed_count)
     if removed_count > 0:
         print(f"✓ {removed_count}개의 짧은 중복 자막을 제거했습니다.", file=sys.stderr)
 
     return filtered_subs
 
 
+@telemetry.traced('preprocess.group')
 def group_subtitles(subs, max_gap_ms=300, max_len=150):
     """연속된 자막을 문맥을 고려하여 문장 단위로 합칩니다."""
     if not subs:
@@ -76,22 +90,40 @@ def group_subtitles(subs, max_gap_ms=300, max_len=150):
     grouped_subs.append(current_group)
 
     merged_count = len(subs) - len(grouped_subs)
+    telemetry.count('cues.processed', len(subs), stage='group')
+    telemetry.current_span().set_attribute('merged', merged_count)
     if merged_count > 0:
         print(f"✓ {merged_count}개의 자막을 문장 단위로 병합했습니다.", file=sys.stderr)
 
     return grouped_subs
 
 
-def extract_subtitle_text(subtitle_path):
+def _load_source(subtitle_path):
+    """SRT 파일 또는 프로젝트 파일의 source 섹션에서 자막을 읽습니다."""
+    if not is_project(subtitle_path):
+        return pysrt.open(subtitle_path)
+
+    with ProjectFile(subtitle_path) as project:
+        return pysrt.SubRipFile([
+            pysrt.SubRipItem(index=i + 1, start=pysrt.SubRipTime(milliseconds=start),
+                             end=pysrt.SubRipTime(milliseconds=end), text=text)
+            for i, (start, end, text) in enumerate(project.section(SOURCE))
+        ])
+
+
+@telemetry.traced('extract')
+def extract_subtitle_text(subtitle_path, project_path=None):
     """
     SRT 자막 파일에서 텍스트만 추출합니다.
 
     Args:
-        subtitle_path (str): SRT 파일 경로
+        subtitle_path (str): SRT 파일 경로 (또는 source 섹션이 있는 프로젝트 파일)
+        project_path (str): 지정하면 원본(source)과 전처리 결과(grouped)를 프로젝트 파일에도 저장
 
     Returns:
         dict: {
             'texts': [텍스트 리스트],
+            'timings': [[시작 ms, 종료 ms] 리스트],
             'metadata': {
                 'total_count': int,
                 'processed_count': int
@@ -99,8 +131,20 @@ def extract_subtitle_text(subtitle_path):
         }
     """
     print(f"자막 로드 중: {subtitle_path}", file=sys.stderr)
-    subs = pysrt.open(subtitle_path)
+    with telemetry.span('extract.parse'):
+        subs = _load_source(subtitle_path)
     print(f"총 {len(subs)}개의 자막 항목을 로드했습니다.", file=sys.stderr)
+    if telemetry.enabled():
+        telemetry.count('bytes.read', os.path.getsize(subtitle_path), stage='extract')
+    telemetry.current_span().set_attribute('cues_in', len(subs))
+
+    # 전처리는 자막 객체를 직접 바꾸므로 원본은 미리 복사해 둡니다.
+    source = None
+    project_metadata = {}
+    if project_path:
+        source = ([(sub.start.ordinal, sub.end.ordinal) for sub in subs], [sub.text for sub in subs])
+        if not is_project(subtitle_path):
+            project_metadata['subtitle_path'] = os.path.abspath(subtitle_path)
 
     # 자막 전처리
     print("\n자막 전처리 중...", file=sys.stderr)
@@ -110,27 +154,66 @@ def extract_subtitle_text(subtitle_path):
 
     # 텍스트만 추출
     texts = [sub.text.replace('\n', ' ').strip() for sub in subs]
+    timings = [[sub.start.ordinal, sub.end.ordinal] for sub in subs]
+    telemetry.current_span().set_attribute('cues_out', len(texts))
 
     result = {
         'texts': texts,
+        'timings': timings,
         'metadata': {
             'total_count': len(subs),
             'processed_count': len(texts)
         }
     }
 
+    if project_path:
+        with telemetry.span('extract.save_project'):
+            update_project(project_path, {SOURCE: source, GROUPED: (timings, texts)}, project_metadata)
+        if telemetry.enabled():
+            telemetry.count('bytes.written', os.path.getsize(project_path), stage='extract')
+        print(f"✓ 프로젝트 파일 저장: {project_path}", file=sys.stderr)
+        result['metadata']['project_path'] = project_path
+
     return result
 
 
+def _pop_option(args, name):
+    """args에서 '--name 값' 옵션을 꺼내 값을 반환합니다."""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args) or args[index + 1].startswith('--'):
+        print(f"오류: {name} 뒤에 값을 지정하세요.", file=sys.stderr)
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python extract_subtitle_text.py <srt_file_path>", file=sys.stderr)
+    args = sys.argv[1:]
+    profile = '--profile' in args
+    if profile:
+        args.remove('--profile')
+    profile_memory = '--profile-memory' in args
+    if profile_memory:
+        args.remove('--profile-memory')
+
+    project_path = _pop_option(args, '--project')
+
+    if len(args) < 1:
+        print("Usage: python extract_subtitle_text.py <srt_file_path> [--project <project.ytkr>] [--profile | --profile-memory]", file=sys.stderr)
         sys.exit(1)
 
     # Remove surrounding quotes from path if present
-    subtitle_path = sys.argv[1].strip('"')
+    subtitle_path = args[0].strip('"')
 
-    result = extract_subtitle_text(subtitle_path)
+    # --profile: 자막 파일 옆에 프로파일 보고서와 collapsed stack 저장
+    # --profile-memory: 자막 파일 옆에 메모리 할당 보고서 저장
+    with maybe_profile(profile, 'extract_subtitle_text', os.path.dirname(os.path.abspath(subtitle_path)),
+                       memory=profile_memory):
+        result = extract_subtitle_text(subtitle_path, project_path)
+        output = json.dumps(result, indent=2, ensure_ascii=False)
 
     # JSON 형식으로 텍스트 출력
-    print(json.dumps(result, indent=2, ensure_ascii=False))
+    print(output)
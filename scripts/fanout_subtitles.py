@@ -0,0 +1,251 @@
+"""하나의 자막 추출 결과로 여러 언어 자막 영상을 한 번에 만드는 스크립트
+
+1. subtitle_texts.json(extract_subtitle_text.py 결과)을 한 번만 읽습니다.
+2. N개 대상 언어로 동시에 번역합니다. (요청 속도 제한은 모든 언어가 공유)
+3. 언어별 SRT를 만듭니다. (추출 결과의 timings를 재사용, 원본 SRT는 다시 해석하지 않음)
+4. FFmpeg 한 번 실행으로 모든 언어 버전을 합성합니다. (원본 1회 디코딩, split 필터)
+
+출력 디렉토리에 translated_texts.<lang>.json이 이미 있으면 그 언어는 다시 번역하지 않습니다.
+(Quality Path로 직접 번역한 언어와 자동 번역 언어를 섞어 쓸 수 있습니다.)
+
+번역에 실패한 항목이 있는 언어는 translated_texts.<lang>.partial.json으로만 저장하고 합성에서 제외합니다.
+다음 실행에서는 실패한 항목만 다시 번역합니다.
+"""
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+from translate_subtitles import (
+    BACKENDS, TokenBucket, create_backend, load_partial, save_partial, translate_texts,
+)
+from merge_translated_subtitle import load_grouped_spans, write_translated_srt
+from process_video import burn_subtitles_multi, check_ffmpeg
+from stage_profiler import maybe_profile
+
+
+async def translate_languages(texts, langs, backend_name='google', source='en',
+                              rate=5.0, batch_size=20, concurrency=4, backend_options=None,
+                              prefilled=None):
+    """
+    여러 대상 언어로 동시에 번역합니다.
+
+    Args:
+        prefilled (dict): {lang: translate_texts()의 prefilled 리스트} (이전 부분 번역 재사용)
+
+    Returns:
+        dict: {lang: translate_texts() 결과}
+    """
+    rate_limiter = TokenBucket(rate)
+    backends = [
+        create_backend(backend_name, source, lang, rate_limiter, **(backend_options or {}))
+        for lang in langs
+    ]
+    prefilled = prefilled or {}
+    results = await asyncio.gather(*(
+        translate_texts(texts, backend, batch_size=batch_size, concurrency=concurrency,
+                        prefilled=prefilled.get(lang))
+        for lang, backend in zip(langs, backends)
+    ))
+    return dict(zip(langs, results))
+
+
+def fanout_subtitles(original_srt, subtitle_texts_path, video_path, output_dir, langs,
+                     backend_name='google', rate=5.0, fonts=None, font_name="Arial",
+                     font_size=20, target_height=None, backend_options=None):
+    """
+    여러 언어 자막 영상을 만듭니다.
+
+    Args:
+        original_srt (str): 원본 영어 SRT (subtitle_texts.json에 timings가 없을 때만 사용)
+        subtitle_texts_path (str): extract_subtitle_text.py 결과 JSON
+        video_path (str): 원본 영상
+        output_dir (str): 결과 저장 디렉토리
+        langs (list): 대상 언어 코드 (예: ['ko', 'ja', 'zh-CN'])
+        backend_name (str): 번역 백엔드 이름
+        rate (float): 모든 언어가 공유하는 초당 최대 요청 수
+        fonts (dict): 언어별 폰트 이름 (없으면 font_name)
+        font_name (str): 기본 폰트 이름
+        font_size (int): 폰트 크기
+        target_height (int): 지정하면 합성 전에 이 높이로 축소
+
+    Returns:
+        dict: {
+            'success': bool,                  # 모든 언어가 번역되고 합성되었을 때만 True
+            'error': str,                     # 실패 시
+            'languages': {lang: {'translated_path', 'subtitle_path', 'output_path', 'failed_indices'}},
+            'failed_languages': {lang: 번역 실패 항목 수},   # 합성에서 제외된 언어
+            'translation_metrics': {lang: dict},
+            'burn': dict or None
+        }
+    """
+    fonts = fonts or {}
+    os.makedirs(output_dir, exist_ok=True)
+
+    with open(subtitle_texts_path, 'r', encoding='utf-8') as f:
+        extracted = json.load(f)
+    texts = extracted['texts']
+
+    languages = {}
+    to_translate = []
+    prefilled = {}
+    for lang in langs:
+        translated_path = os.path.join(output_dir, f"translated_texts.{lang}.json")
+        languages[lang] = {
+            'translated_path': translated_path,
+            'partial_path': os.path.join(output_dir, f"translated_texts.{lang}.partial.json"),
+            'subtitle_path': os.path.join(output_dir, f"video.{lang}.srt"),
+            'output_path': os.path.join(output_dir, f"video_{lang}.mp4"),
+            'failed_indices': [],
+        }
+        if os.path.exists(translated_path):
+            print(f"✓ 기존 번역 사용 ({lang}): {translated_path}", file=sys.stderr)
+            continue
+
+        to_translate.append(lang)
+        previous = load_partial(languages[lang]['partial_path'], len(texts))
+        if previous is not None:
+            prefilled[lang] = previous
+            retry_count = sum(1 for text in previous if text is None)
+            print(f"✓ 이전 부분 번역 사용 ({lang}): 실패했던 {retry_count}개 항목만 다시 번역합니다.",
+                  file=sys.stderr)
+
+    # Step 1: 동시 번역
+    metrics = {}
+    if to_translate:
+        print(f"[1/3] {len(texts)}개 항목을 {', '.join(to_translate)}로 동시 번역 중...", file=sys.stderr)
+        translated = asyncio.run(translate_languages(
+            texts, to_translate, backend_name, rate=rate, backend_options=backend_options,
+            prefilled=prefilled
+        ))
+        for lang, result in translated.items():
+            info = languages[lang]
+            info['failed_indices'] = result['failed_indices']
+            metrics[lang] = result['metrics']
+            if result['failed_indices']:
+                # 실패한 항목에는 원문이 들어 있으므로 완성된 번역으로 저장하지 않습니다.
+                save_partial(info['partial_path'], result)
+                print(f"⚠ {lang}: {len(result['failed_indices'])}개 항목 번역 실패, "
+                      f"부분 번역을 {info['partial_path']}에 저장했습니다.", file=sys.stderr)
+                continue
+
+            with open(info['translated_path'], 'w', encoding='utf-8') as f:
+                json.dump(result['translations'], f, ensure_ascii=False, indent=2)
+            if os.path.exists(info['partial_path']):
+                os.remove(info['partial_path'])
+
+    failed_languages = {
+        lang: len(info['failed_indices'])
+        for lang, info in languages.items() if info['failed_indices']
+    }
+    ready = {lang: info for lang, info in languages.items() if lang not in failed_languages}
+    error = None
+    if failed_languages:
+        error = "번역 실패로 합성에서 제외: " + ', '.join(
+            f"{lang} ({count}개 항목)" for lang, count in failed_languages.items()
+        )
+    if not ready:
+        return {
+            'success': False,
+            'error': error,
+            'languages': languages,
+            'failed_languages': failed_languages,
+            'translation_metrics': metrics,
+            'burn': None
+        }
+
+    # Step 2: 언어별 SRT 생성
+    print("\n[2/3] 언어별 자막 파일 생성 중...", file=sys.stderr)
+    timings = extracted.get('timings')
+    if timings is None:
+        # timings가 없는 이전 추출 결과만 원본 SRT를 한 번 해석합니다.
+        timings = load_grouped_spans(original_srt)
+    for lang, info in ready.items():
+        with open(info['translated_path'], 'r', encoding='utf-8') as f:
+            translated_texts = json.load(f)
+        merged = write_translated_srt(timings, translated_texts, info['subtitle_path'])
+        if not merged['success']:
+            return {
+                'success': False,
+                'error': f"{lang}: {merged['error']}",
+                'languages': languages,
+                'failed_languages': failed_languages,
+                'translation_metrics': metrics,
+                'burn': None
+            }
+
+    # Step 3: 한 번의 디코딩으로 모든 언어 버전 합성
+    print("\n[3/3] 영상 합성 중...", file=sys.stderr)
+    burn = burn_subtitles_multi(video_path, [
+        {
+            'subtitle_path': info['subtitle_path'],
+            'output_path': info['output_path'],
+            'font_name': fonts.get(lang, font_name),
+            'font_size': font_size,
+        }
+        for lang, info in ready.items()
+    ], target_height=target_height)
+
+    result = {
+        'success': burn['success'] and not failed_languages,
+        'languages': languages,
+        'failed_languages': failed_languages,
+        'translation_metrics': metrics,
+        'burn': burn
+    }
+    if not burn['success']:
+        error = '; '.join(filter(None, [error, burn.get('error')]))
+    if error:
+        result['error'] = error
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="여러 언어 자막 영상 동시 생성")
+    parser.add_argument('original_srt')
+    parser.add_argument('subtitle_texts')
+    parser.add_argument('video_path')
+    parser.add_argument('output_dir')
+    parser.add_argument('--langs', default='ko', help="쉼표로 구분한 대상 언어 (예: ko,ja,zh-CN)")
+    parser.add_argument('--backend', default='google', choices=sorted(BACKENDS))
+    parser.add_argument('--rate', type=float, default=5.0, help="모든 언어가 공유하는 초당 최대 요청 수")
+    parser.add_argument('--font-name', default="Arial")
+    parser.add_argument('--font-size', type=int, default=20)
+    parser.add_argument('--font', action='append', default=[], metavar='LANG=FONT',
+                        help="언어별 폰트 (예: --font ja='Noto Sans CJK JP')")
+    parser.add_argument('--height', type=int, help="합성 전에 이 높이로 축소")
+    parser.add_argument('--profile', action='store_true',
+                        help="출력 디렉토리에 프로파일 보고서와 collapsed stack 저장")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="출력 디렉토리에 메모리 할당 보고서 저장 (--profile과 따로 실행)")
+    args = parser.parse_args()
+
+    if not check_ffmpeg():
+        print("오류: FFmpeg가 설치되어 있지 않습니다.", file=sys.stderr)
+        sys.exit(1)
+
+    fonts = {}
+    for item in args.font:
+        lang, _, name = item.partition('=')
+        fonts[lang] = name
+
+    try:
+        with maybe_profile(args.profile, 'fanout_subtitles', args.output_dir, memory=args.profile_memory):
+            result = fanout_subtitles(
+                args.original_srt, args.subtitle_texts, args.video_path, args.output_dir,
+                [lang.strip() for lang in args.langs.split(',') if lang.strip()],
+                backend_name=args.backend,
+                rate=args.rate,
+                fonts=fonts,
+                font_name=args.font_name,
+                font_size=args.font_size,
+                target_height=args.height,
+            )
+    except (ValueError, RuntimeError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if not result['success']:
+        sys.exit(1)
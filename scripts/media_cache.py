@@ -0,0 +1,410 @@
+"""영상 ID 기반 로컬 미디어 캐시 스크립트
+
+같은 영상을 폰트, 번역, 그룹핑만 바꿔 다시 처리할 때 네트워크 다운로드와
+중복 디스크 쓰기를 피하기 위해 다운로드한 영상과 자막을 한 곳에 보관합니다.
+
+저장소 구조:
+    <cache_dir>/
+    ├── index.json                      # 캐시된 영상/자막 목록과 마지막 사용 시각
+    ├── index.lock                      # index.json 갱신 시 잡는 파일 잠금
+    ├── objects/<video_id>/video-<format_key>.<ext>
+    ├── objects/<video_id>/subtitle-<lang>.<ext>
+    ├── objects/<video_id>/words-<lang>.json3    # 자동 자막 단어 타이밍
+    └── staging/                        # 다운로드 중인 임시 파일
+        └── <video_id>/                 # 영상 다운로드용 (실패 시 남겨 두어 .part에서 이어 받기)
+
+프로젝트 디렉토리로는 하드링크 → reflink → 복사 순서로 꺼내므로
+같은 파일 시스템에서는 추가 디스크 사용이 없습니다.
+
+index.json은 여러 프로세스(및 같은 프로세스의 여러 스레드)가 함께 쓰므로, 갱신할 때마다
+index.lock을 잡고 디스크의 인덱스를 다시 읽어 변경 사항을 반영한 뒤 저장합니다.
+조회(get)는 인덱스를 쓰지 않고 마지막 사용 시각만 메모리에 모아 두었다가
+다음 갱신이나 flush() 때 함께 저장합니다.
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 간 잠금 없이 스레드 잠금만 사용
+    fcntl = None
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.path.expanduser('~'), '.cache', 'youtube-kr-subtitle', 'media'
+)
+DEFAULT_MAX_BYTES = 20 * 1024 ** 3  # 20GB
+CACHE_DIR_ENV = 'YT_KR_SUBTITLE_CACHE_DIR'
+CACHE_MAX_BYTES_ENV = 'YT_KR_SUBTITLE_CACHE_MAX_BYTES'
+INDEX_VERSION = 1
+
+# linux/fs.h 의 FICLONE ioctl (btrfs, xfs 등에서 reflink 복사)
+FICLONE = 0x40049409
+
+_VIDEO_ID_PATTERNS = [
+    re.compile(r'(?:v=|/v/|/embed/|/shorts/|/live/|youtu\.be/)([A-Za-z0-9_-]{11})'),
+    re.compile(r'^([A-Za-z0-9_-]{11})$'),
+]
+
+
+def extract_video_id(url):
+    """
+    URL에서 YouTube 영상 ID를 추출합니다. (네트워크 접근 없음)
+
+    Returns:
+        str or None: 11자리 영상 ID, 인식할 수 없으면 None
+    """
+    for pattern in _VIDEO_ID_PATTERNS:
+        match = pattern.search(url.strip())
+        if match:
+            return match.group(1)
+    return None
+
+
+def format_key(format_selector):
+    """yt-dlp 포맷 선택 문자열을 파일 이름에 쓸 수 있는 짧은 키로 변환합니다."""
+    return hashlib.sha1(format_selector.encode('utf-8')).hexdigest()[:12]
+
+
+def _reflink(src_path, dest_path):
+    """FICLONE ioctl로 reflink 복사를 시도합니다. 지원하지 않으면 OSError를 발생시킵니다."""
+    if fcntl is None:
+        raise OSError("reflink를 지원하지 않는 플랫폼입니다.")
+
+    with open(src_path, 'rb') as src, open(dest_path, 'wb') as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dest.close()
+            os.remove(dest_path)
+            raise
+
+
+class MediaCache:
+    """
+    video_id와 포맷으로 주소가 정해지는 미디어 저장소.
+    한 인스턴스를 여러 스레드가 함께 사용해도 됩니다.
+
+    Args:
+        cache_dir (str): 캐시 디렉토리 (기본값: ~/.cache/youtube-kr-subtitle/media)
+        max_bytes (int): 캐시 최대 크기. 초과하면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = os.path.abspath(cache_dir or DEFAULT_CACHE_DIR)
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV, DEFAULT_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(self.cache_dir, 'index.json')
+        self.lock_path = os.path.join(self.cache_dir, 'index.lock')
+        self.objects_dir = os.path.join(self.cache_dir, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.RLock()
+        self._pending_access = {}
+        self.index = self._load_index()
+
+    # ------------------------------------------------------------------
+    # 인덱스 관리
+    # ------------------------------------------------------------------
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                if index.get('version') == INDEX_VERSION:
+                    return index
+            except (OSError, ValueError):
+                print("⚠ 캐시 인덱스가 손상되어 새로 만듭니다.", file=sys.stderr)
+        return {'version': INDEX_VERSION, 'entries': {}, 'videos': {}}
+
+    def _save_index(self):
+        # 임시 파일에 쓴 뒤 교체하여 중간에 중단되어도 인덱스가 깨지지 않게 합니다.
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @contextlib.contextmanager
+    def _update(self):
+        """
+        index.lock을 잡은 채로 디스크의 인덱스를 다시 읽어 self.index에 두고,
+        블록이 정상 종료되면 저장합니다. 다른 프로세스가 그 사이에 추가한 항목을 덮어쓰지 않습니다.
+        """
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            self.index = self._load_index()
+            # 조회로 모아 둔 마지막 사용 시각 반영
+            for key, accessed in self._pending_access.items():
+                entry = self.index['entries'].get(key)
+                if entry is not None:
+                    entry['last_access'] = max(entry['last_access'], accessed)
+            self._pending_access.clear()
+            yield self.index
+            self._save_index()
+
+    def flush(self):
+        """조회로 모아 둔 마지막 사용 시각을 인덱스에 저장합니다."""
+        if self._pending_access:
+            with self._update():
+                pass
+
+    @staticmethod
+    def video_key(video_id, format_selector):
+        return f"{video_id}/video-{format_key(format_selector)}"
+
+    @staticmethod
+    def subtitle_key(video_id, lang):
+        return f"{video_id}/subtitle-{lang}"
+
+    @staticmethod
+    def word_timing_key(video_id, lang):
+        return f"{video_id}/words-{lang}"
+
+    def staging_path(self, name):
+        """이름이 고정된 다운로드 임시 디렉토리 경로 (만들지는 않음)"""
+        return os.path.join(self.cache_dir, 'staging', name)
+
+    def staging_dir(self, name=None):
+        """
+        다운로드용 임시 디렉토리를 만듭니다. (캐시와 같은 파일 시스템)
+
+        Args:
+            name (str): 지정하면 항상 같은 디렉토리를 사용합니다. 중단된 다운로드의
+                .part 파일이 남아 있으면 다음 다운로드가 이어 받을 수 있습니다.
+                None이면 매번 새 임시 디렉토리를 만듭니다.
+        """
+        staging_root = os.path.join(self.cache_dir, 'staging')
+        os.makedirs(staging_root, exist_ok=True)
+        if name is None:
+            return tempfile.mkdtemp(dir=staging_root)
+        path = self.staging_path(name)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def get(self, key):
+        """
+        캐시 항목을 조회합니다. 조회된 항목은 최근 사용으로 기록되며,
+        기록은 다음 인덱스 갱신이나 flush() 때 저장됩니다.
+
+        Returns:
+            dict or None: {'path', 'size', 'kind', 'video_id', ...}
+        """
+        with self._lock:
+            entry = self.index['entries'].get(key)
+            if entry is None:
+                # 다른 프로세스가 그 사이에 추가했을 수 있으므로 디스크에서 다시 확인
+                self.index = self._load_index()
+                entry = self.index['entries'].get(key)
+                if entry is None:
+                    return None
+
+            path = os.path.join(self.cache_dir, entry['path'])
+            if not os.path.exists(path):
+                # 외부에서 지워진 파일은 인덱스에서도 제거
+                with self._update() as index:
+                    index['entries'].pop(key, None)
+                return None
+
+            self._pending_access[key] = time.time()
+            return dict(entry, path=path)
+
+    def put(self, key, src_path, kind, video_id, **extra):
+        """
+        파일을 캐시에 넣습니다. 원본 파일은 캐시로 이동됩니다.
+
+        Args:
+            key (str): video_key(), subtitle_key() 또는 word_timing_key() 결과
+            src_path (str): 저장할 파일 경로
+            kind (str): 'video', 'subtitle' 또는 'word_timing'
+            video_id (str): YouTube 영상 ID
+            **extra: 인덱스에 함께 기록할 값 (lang, format 등)
+
+        Returns:
+            dict: 저장된 캐시 항목
+        """
+        ext = os.path.splitext(src_path)[1]
+        rel_path = os.path.join('objects', key + ext)
+        dest_path = os.path.join(self.cache_dir, rel_path)
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        shutil.move(src_path, dest_path)
+
+        entry = {
+            'path': rel_path,
+            'size': os.path.getsize(dest_path),
+            'kind': kind,
+            'video_id': video_id,
+            'created': time.time(),
+            'last_access': time.time(),
+        }
+        entry.update(extra)
+        with self._update() as index:
+            index['entries'][key] = entry
+            self._evict(keep=key)
+        return dict(entry, path=dest_path)
+
+    def get_video_info(self, video_id):
+        """캐시된 영상 메타데이터(title, description, duration 등)를 반환합니다."""
+        with self._lock:
+            info = self.index['videos'].get(video_id)
+            if info is None:
+                self.index = self._load_index()
+                info = self.index['videos'].get(video_id)
+            return info
+
+    def put_video_info(self, video_id, info):
+        with self._update() as index:
+            index['videos'].setdefault(video_id, {}).update(info)
+
+    def find_subtitle(self, video_id, langs):
+        """langs 순서대로 캐시된 자막을 찾습니다."""
+        for lang in langs:
+            entry = self.get(self.subtitle_key(video_id, lang))
+            if entry:
+                return entry
+        return None
+
+    def find_word_timing(self, video_id, langs):
+        """langs 순서대로 캐시된 단어 타이밍(json3)을 찾습니다."""
+        for lang in langs:
+            entry = self.get(self.word_timing_key(video_id, lang))
+            if entry:
+                return entry
+        return None
+
+    # ------------------------------------------------------------------
+    # 용량 관리
+    # ------------------------------------------------------------------
+    def total_size(self):
+        return sum(entry['size'] for entry in self.index['entries'].values())
+
+    def evict(self, keep=None):
+        """
+        캐시 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제합니다.
+
+        Args:
+            keep (str): 방금 추가한 항목처럼 삭제하지 않을 키
+
+        Returns:
+            list: 삭제된 키 목록
+        """
+        with self._update():
+            return self._evict(keep)
+
+    def _evict(self, keep=None):
+        """evict()의 본체. _update() 블록 안에서 호출합니다."""
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return []
+
+        evicted = []
+        candidates = sorted(
+            (item for item in self.index['entries'].items() if item[0] != keep),
+            key=lambda item: item[1]['last_access']
+        )
+        for key, entry in candidates:
+            if total <= self.max_bytes:
+                break
+            path = os.path.join(self.cache_dir, entry['path'])
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= entry['size']
+            del self.index['entries'][key]
+            evicted.append(key)
+
+        # 항목이 모두 사라진 영상의 메타데이터 정리
+        live_ids = {entry['video_id'] for entry in self.index['entries'].values()}
+        for video_id in list(self.index['videos']):
+            if video_id not in live_ids:
+                del self.index['videos'][video_id]
+
+        if evicted:
+            print(f"✓ 캐시 용량 초과로 {len(evicted)}개 항목을 삭제했습니다.", file=sys.stderr)
+        return evicted
+
+    # ------------------------------------------------------------------
+    # 프로젝트 디렉토리로 꺼내기
+    # ------------------------------------------------------------------
+    @staticmethod
+    def materialize(cached_path, dest_path):
+        """
+        캐시 파일을 프로젝트 디렉토리에 배치합니다.
+        하드링크 → reflink → 복사 순서로 시도합니다.
+
+        Returns:
+            str: 'existing', 'hardlink', 'reflink', 'copy' 중 하나
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(dest_path)), exist_ok=True)
+
+        if os.path.exists(dest_path):
+            if os.path.samefile(cached_path, dest_path):
+                return 'existing'
+            os.remove(dest_path)
+
+        try:
+            os.link(cached_path, dest_path)
+            return 'hardlink'
+        except OSError:
+            pass
+
+        try:
+            _reflink(cached_path, dest_path)
+            return 'reflink'
+        except OSError:
+            pass
+
+        shutil.copy2(cached_path, dest_path)
+        return 'copy'
+
+    def stats(self):
+        entries = self.index['entries'].values()
+        return {
+            'cache_dir': self.cache_dir,
+            'max_bytes': self.max_bytes,
+            'total_bytes': self.total_size(),
+            'video_count': len(self.index['videos']),
+            'video_files': sum(1 for e in entries if e['kind'] == 'video'),
+            'subtitle_files': sum(1 for e in entries if e['kind'] == 'subtitle'),
+            'word_timing_files': sum(1 for e in entries if e['kind'] == 'word_timing'),
+        }
+
+
+def resolve_cache(cache_dir=None):
+    """
+    cache_dir 인자나 YT_KR_SUBTITLE_CACHE_DIR 환경 변수로 캐시를 엽니다.
+    둘 다 없으면 None을 반환합니다. (캐시 비활성화)
+    """
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return None
+    return MediaCache(cache_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'list', 'evict'):
+        print("Usage: python media_cache.py <stats|list|evict> [cache_dir]", file=sys.stderr)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    cache = MediaCache(sys.argv[2] if len(sys.argv) > 2 else os.environ.get(CACHE_DIR_ENV))
+
+    if command == 'stats':
+        result = cache.stats()
+    elif command == 'list':
+        result = {
+            'videos': cache.index['videos'],
+            'entries': cache.index['entries'],
+        }
+    else:
+        result = {'evicted': cache.evict(), 'stats': cache.stats()}
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,307 @@
+"""ffprobe로 영상 정보를 조사하고 자막 합성 인코딩 방식을 결정하는 스크립트
+
+process_video.py의 burn_subtitles()가 인코딩 전에 사용합니다.
+- probe_media(): 코덱, 해상도, 프레임 레이트, 길이 조사 (파일별 결과 캐시)
+- plan_encode(): 인코더, 축소 필터, 오디오 복사 여부, 예상 소요 시간 결정
+- encode_fingerprint() / is_up_to_date(): 출력 파일이 이미 같은 입력과 설정으로 만든 결과인지 확인
+- generate_test_clip(): ffmpeg testsrc로 작은 테스트 영상 생성
+"""
+import os
+import sys
+import json
+import hashlib
+import subprocess
+
+# 컨테이너별로 재인코딩 없이 복사할 수 있는 오디오 코덱
+COPYABLE_AUDIO_CODECS = {
+    '.mp4': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    '.m4v': {'aac', 'mp3', 'ac3', 'eac3', 'alac'},
+    '.mov': {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'pcm_s16le'},
+    '.webm': {'opus', 'vorbis'},
+    '.mkv': None,  # 대부분의 코덱 허용
+}
+
+# 컨테이너별 기본 인코더 (앞에서부터 설치된 것을 사용)
+VIDEO_ENCODERS = {
+    '.webm': ['libvpx-vp9', 'libvpx'],
+    'default': ['libx264', 'libopenh264', 'mpeg4'],
+}
+AUDIO_ENCODERS = {
+    '.webm': 'libopus',
+    'default': 'aac',
+}
+
+# 8코어 기준 인코더별 대략적인 처리량 (초당 픽셀 수). 예상 시간 계산용입니다.
+ENCODER_PIXELS_PER_SECOND = {
+    'libx264': 60e6,
+    'libopenh264': 80e6,
+    'mpeg4': 200e6,
+    'libvpx-vp9': 12e6,
+    'libvpx': 25e6,
+}
+DEFAULT_PIXELS_PER_SECOND = 50e6
+REFERENCE_CORES = 8
+
+_probe_cache = {}
+_encoder_cache = {}
+
+
+class MediaProbeError(Exception):
+    """ffprobe 실행 또는 결과 해석 실패"""
+
+
+def _parse_rate(rate):
+    """'30000/1001' 형식의 프레임 레이트를 float로 변환합니다."""
+    if not rate or rate == '0/0':
+        return 0.0
+    if '/' in rate:
+        num, den = rate.split('/', 1)
+        return float(num) / float(den) if float(den) else 0.0
+    return float(rate)
+
+
+def probe_media(path):
+    """
+    ffprobe로 미디어 파일 정보를 조사합니다.
+    같은 파일(경로, 크기, 수정 시각이 같음)은 다시 ffprobe를 실행하지 않습니다.
+
+    Returns:
+        dict: {
+            'path': str,
+            'format_name': str,
+            'duration': float,
+            'size': int,
+            'bit_rate': int,
+            'video': {'codec', 'width', 'height', 'fps', 'pix_fmt', 'frames'} or None,
+            'audio': {'codec', 'channels', 'sample_rate'} or None,
+            'tags': dict
+        }
+
+    Raises:
+        MediaProbeError: ffprobe가 없거나 파일을 해석할 수 없을 때
+    """
+    stat = os.stat(path)
+    cache_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if cache_key in _probe_cache:
+        return _probe_cache[cache_key]
+
+    command = [
+        'ffprobe', '-v', 'error',
+        '-print_format', 'json',
+        '-show_format', '-show_streams',
+        path
+    ]
+    try:
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        data = json.loads(result.stdout)
+    except FileNotFoundError:
+        raise MediaProbeError("ffprobe를 찾을 수 없습니다.")
+    except subprocess.CalledProcessError as e:
+        raise MediaProbeError(f"ffprobe 오류: {e.stderr.strip()}")
+    except ValueError as e:
+        raise MediaProbeError(f"ffprobe 결과 해석 실패: {e}")
+
+    fmt = data.get('format', {})
+    video = audio = None
+    for stream in data.get('streams', []):
+        codec_type = stream.get('codec_type')
+        disposition = stream.get('disposition', {})
+        if codec_type == 'video' and video is None and not disposition.get('attached_pic'):
+            video = {
+                'codec': stream.get('codec_name'),
+                'width': int(stream.get('width', 0)),
+                'height': int(stream.get('height', 0)),
+                'fps': round(_parse_rate(stream.get('avg_frame_rate') or stream.get('r_frame_rate')), 3),
+                'pix_fmt': stream.get('pix_fmt'),
+                'frames': int(stream['nb_frames']) if stream.get('nb_frames', '').isdigit() else None,
+            }
+        elif codec_type == 'audio' and audio is None:
+            audio = {
+                'codec': stream.get('codec_name'),
+                'channels': int(stream.get('channels', 0)),
+                'sample_rate': int(stream.get('sample_rate', 0)),
+            }
+
+    info = {
+        'path': path,
+        'format_name': fmt.get('format_name'),
+        'duration': float(fmt.get('duration', 0.0)),
+        'size': int(fmt.get('size', stat.st_size)),
+        'bit_rate': int(fmt.get('bit_rate', 0)),
+        'video': video,
+        'audio': audio,
+        'tags': {key.lower(): value for key, value in fmt.get('tags', {}).items()},
+    }
+    _probe_cache[cache_key] = info
+    return info
+
+
+def available_encoders():
+    """설치된 FFmpeg가 지원하는 인코더 이름 집합을 반환합니다."""
+    if 'encoders' in _encoder_cache:
+        return _encoder_cache['encoders']
+
+    encoders = set()
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            check=True, capture_output=True, text=True
+        )
+        started = False
+        for line in result.stdout.splitlines():
+            if line.strip().startswith('------'):
+                started = True
+                continue
+            parts = line.split()
+            if started and len(parts) >= 2:
+                encoders.add(parts[1])
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        pass
+
+    _encoder_cache['encoders'] = encoders
+    return encoders
+
+
+def estimate_encode_seconds(duration, width, height, fps, encoder):
+    """해상도, 길이, 인코더로 대략적인 인코딩 소요 시간(초)을 계산합니다."""
+    pixels_per_second = ENCODER_PIXELS_PER_SECOND.get(encoder, DEFAULT_PIXELS_PER_SECOND)
+    pixels_per_second *= (os.cpu_count() or REFERENCE_CORES) / REFERENCE_CORES
+    total_pixels = duration * (fps or 30) * width * height
+    return total_pixels / pixels_per_second
+
+
+def plan_encode(probe, output_path, target_height=None, encoder=None, encoders=None):
+    """
+    조사 결과로 인코딩 방식을 결정합니다. (FFmpeg 실행 없음)
+
+    Args:
+        probe (dict): probe_media() 결과
+        output_path (str): 출력 파일 경로 (확장자로 컨테이너 판단)
+        target_height (int): 지정하면 이보다 큰 영상은 자막 합성 전에 축소합니다
+        encoder (str): 영상 인코더를 직접 지정 (None이면 자동 선택)
+        encoders (set): 사용 가능한 인코더 (None이면 available_encoders())
+
+    Returns:
+        dict: {
+            'video_encoder': str,
+            'pre_filters': [str],      # subtitles 필터 앞에 붙일 필터
+            'audio_args': [str],
+            'output_width': int,
+            'output_height': int,
+            'estimated_seconds': float
+        }
+    """
+    ext = os.path.splitext(output_path)[1].lower()
+    video = probe.get('video') or {}
+    audio = probe.get('audio')
+    width, height = video.get('width', 0), video.get('height', 0)
+
+    # 해상도: 요청된 높이보다 크면 자막 합성 전에 축소 (필터 처리량 감소)
+    pre_filters = []
+    out_width, out_height = width, height
+    if target_height and height and target_height < height:
+        pre_filters.append(f"scale=-2:{target_height}")
+        out_height = target_height
+        out_width = int(round(width * target_height / height / 2)) * 2
+
+    # 영상 인코더
+    if encoder is None:
+        if encoders is None:
+            encoders = available_encoders()
+        candidates = VIDEO_ENCODERS.get(ext, VIDEO_ENCODERS['default'])
+        encoder = next((name for name in candidates if name in encoders), candidates[0])
+
+    # 오디오: 출력 컨테이너와 호환되면 복사, 아니면 재인코딩
+    if audio is None:
+        audio_args = []
+    else:
+        copyable = COPYABLE_AUDIO_CODECS.get(ext, COPYABLE_AUDIO_CODECS['.mp4'])
+        if copyable is None or audio['codec'] in copyable:
+            audio_args = ['-c:a', 'copy']
+        else:
+            audio_args = ['-c:a', AUDIO_ENCODERS.get(ext, AUDIO_ENCODERS['default'])]
+
+    estimated = estimate_encode_seconds(
+        probe.get('duration', 0.0), out_width, out_height, video.get('fps'), encoder
+    )
+
+    return {
+        'video_encoder': encoder,
+        'pre_filters': pre_filters,
+        'audio_args': audio_args,
+        'output_width': out_width,
+        'output_height': out_height,
+        'estimated_seconds': round(estimated, 1),
+    }
+
+
+def encode_fingerprint(video_path, subtitle_path, settings):
+    """
+    입력 영상, 자막 내용, 인코딩 설정으로 결과물 식별값을 만듭니다.
+    burn_subtitles()가 출력 파일의 comment 메타데이터에 기록합니다.
+    """
+    stat = os.stat(video_path)
+    digest = hashlib.sha1()
+    digest.update(f"{os.path.abspath(video_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8'))
+    with open(subtitle_path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    return 'yt-kr-subtitle:' + digest.hexdigest()
+
+
+def is_up_to_date(video_path, output_path, fingerprint, tolerance=0.5):
+    """
+    출력 파일이 이미 같은 입력과 설정으로 만든 결과인지 확인합니다.
+    식별값이 같고, 영상 스트림이 있으며, 길이가 입력과 같으면 True입니다.
+    """
+    if not os.path.exists(output_path):
+        return False
+
+    try:
+        output = probe_media(output_path)
+        if output['tags'].get('comment') != fingerprint or output['video'] is None:
+            return False
+        source = probe_media(video_path)
+    except MediaProbeError:
+        return False
+
+    return abs(output['duration'] - source['duration']) <= tolerance
+
+
+def generate_test_clip(output_path, duration=2, size='320x240', rate=25, audio=True):
+    """
+    ffmpeg의 testsrc/sine 소스로 작은 테스트 영상을 만듭니다.
+
+    Returns:
+        str: 생성된 파일 경로
+    """
+    command = [
+        'ffmpeg', '-v', 'error', '-y',
+        '-f', 'lavfi', '-i', f"testsrc=duration={duration}:size={size}:rate={rate}",
+    ]
+    if audio:
+        command += ['-f', 'lavfi', '-i', f"sine=frequency=440:duration={duration}", '-c:a', 'aac']
+    command += ['-c:v', 'mpeg4', '-pix_fmt', 'yuv420p', '-shortest', output_path]
+
+    subprocess.run(command, check=True, capture_output=True, text=True)
+    return output_path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python media_probe.py <media_path> [output_path] [target_height]", file=sys.stderr)
+        sys.exit(1)
+
+    media_path = sys.argv[1]
+    try:
+        probe = probe_media(media_path)
+    except (OSError, MediaProbeError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    result = {'probe': probe}
+    if len(sys.argv) > 2:
+        target_height = int(sys.argv[3]) if len(sys.argv) > 3 else None
+        result['plan'] = plan_encode(probe, sys.argv[2], target_height)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
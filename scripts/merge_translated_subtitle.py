@@ -1,9 +1,18 @@
 """번역된 텍스트를 원본 SRT의 타임스탬프와 병합하는 스크립트"""
+import os
 import sys
 import json
 import pysrt
 
+import telemetry
+from stage_profiler import maybe_profile
+from word_timing import DEFAULT_MAX_CHARS, load_word_timing, retime_groups
+from project_format import (
+    GROUPED, TRANSLATED, ProjectFile, export_srt, is_project, update_project
+)
 
+
+@telemetry.traced('preprocess.fix_overlaps')
 def fix_overlapping_subtitles(subs):
     """
     겹치는 자막의 타임스탬프를 수정합니다.
@@ -21,12 +30,15 @@ def fix_overlapping_subtitles(subs):
             )
             fixed_count += 1
 
+    telemetry.count('cues.processed', len(subs), stage='fix_overlaps')
+    telemetry.current_span().set_attribute('fixed', fixed_count)
     if fixed_count > 0:
         print(f"✓ {fixed_count}개의 겹치는 자막 타임스탬프를 수정했습니다.", file=sys.stderr)
 
     return subs
 
 
+@telemetry.traced('preprocess.remove_short_duplicates')
 def remove_short_duplicates(subs, min_duration_ms=150):
     """150ms 미만의 짧고 중복된 자막을 제거합니다."""
     filtered_subs = pysrt.SubRipFile()
@@ -43,12 +55,15 @@ def remove_short_duplicates(subs, min_duration_ms=150):
         filtered_subs.append(sub)
         prev_text = sub.text
 
+    telemetry.count('cues.processed', len(subs), stage='remove_short_duplicates')
+    telemetry.current_span().set_attribute('removed', removed_count)
     if removed_count > 0:
         print(f"✓ {removed_count}개의 짧은 중복 자막을 제거했습니다.", file=sys.stderr)
 
     return filtered_subs
 
 
+@telemetry.traced('preprocess.group')
 def group_subtitles(subs, max_gap_ms=300, max_len=150):
     """연속된 자막을 문맥을 고려하여 문장 단위로 합칩니다."""
     if not subs:
@@ -76,13 +91,17 @@ def group_subtitles(subs, max_gap_ms=300, max_len=150):
     grouped_subs.append(current_group)
 
     merged_count = len(subs) - len(grouped_subs)
+    telemetry.count('cues.processed', len(subs), stage='group')
+    telemetry.current_span().set_attribute('merged', merged_count)
     if merged_count > 0:
         print(f"✓ {merged_count}개의 자막을 문장 단위로 병합했습니다.", file=sys.stderr)
 
     return grouped_subs
 
 
-def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_path):
+@telemetry.traced('merge')
+def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_path,
+                              word_timing_path=None, max_chars=DEFAULT_MAX_CHARS):
     """
     원본 SRT 파일의 타임스탬프와 번역된 텍스트를 병합하여 새 SRT 파일을 생성합니다.
 
@@ -90,6 +109,12 @@ def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_pa
         original_srt_path (str): 원본 SRT 파일 경로 (타임스탬프 정보 포함)
         translated_texts (list): 번역된 텍스트 리스트
         output_srt_path (str): 출력 SRT 파일 경로
+        word_timing_path (str): 단어 타이밍 파일 (.json3/.vtt). 지정하면 자막 시간을
+            실제 발화 구간에 맞추고, max_chars보다 긴 번역문은 단어 시각에서 나눕니다.
+        max_chars (int): 단어 타이밍 사용 시 자막 한 개의 최대 글자 수
+
+    original_srt_path가 프로젝트 파일(.ytkr)이면 SRT를 다시 해석/전처리하지 않고 grouped 섹션의
+    시간을 사용하며, 결과를 프로젝트 파일의 translated 섹션에도 저장합니다.
 
     Returns:
         dict: {
@@ -98,10 +123,18 @@ def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_pa
             'output_path': str
         }
     """
+    if is_project(original_srt_path):
+        return _merge_into_project(original_srt_path, translated_texts, output_srt_path,
+                                   word_timing_path, max_chars)
+
     # 원본 자막 로드
     print(f"원본 자막 로드 중: {original_srt_path}", file=sys.stderr)
-    subs = pysrt.open(original_srt_path)
+    with telemetry.span('merge.parse'):
+        subs = pysrt.open(original_srt_path)
     print(f"총 {len(subs)}개의 자막 항목을 로드했습니다.", file=sys.stderr)
+    if telemetry.enabled():
+        telemetry.count('bytes.read', os.path.getsize(original_srt_path), stage='merge')
+    telemetry.current_span().set_attribute('cues_in', len(subs))
 
     # 자막 전처리 (extract_subtitle_text.py와 동일한 과정)
     print("\n자막 전처리 중...", file=sys.stderr)
@@ -119,12 +152,25 @@ def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_pa
             'output_path': None
         }
 
-    # 텍스트만 교체
-    for i, translated_text in enumerate(translated_texts):
-        subs[i].text = translated_text
+    if word_timing_path:
+        # 단어 타이밍으로 시간 조정 및 긴 번역문 분할
+        with telemetry.span('merge.retime'):
+            timeline = load_word_timing(word_timing_path)
+            spans = [(sub.start.ordinal, sub.end.ordinal) for sub in subs]
+            cues = retime_groups(timeline, spans, translated_texts, max_chars)
+        print(f"✓ 단어 타이밍 {len(timeline)}개로 {len(subs)}개 자막을 {len(cues)}개로 조정했습니다.", file=sys.stderr)
+        subs = _build_srt(cues)
+    else:
+        # 텍스트만 교체
+        for i, translated_text in enumerate(translated_texts):
+            subs[i].text = translated_text
 
     # 새 SRT 파일로 저장
-    subs.save(output_srt_path, encoding='utf-8')
+    with telemetry.span('merge.save'):
+        subs.save(output_srt_path, encoding='utf-8')
+    if telemetry.enabled():
+        telemetry.count('bytes.written', os.path.getsize(output_srt_path), stage='merge')
+    telemetry.count('cues.processed', len(subs), stage='merge')
     print(f"✓ 번역된 자막 저장 완료: {output_srt_path}", file=sys.stderr)
     print(f"✓ 총 {len(subs)}개의 자막 항목 처리", file=sys.stderr)
 
@@ -135,27 +181,169 @@ def merge_translated_subtitle(original_srt_path, translated_texts, output_srt_pa
     }
 
 
+def _merge_into_project(project_path, translated_texts, output_srt_path, word_timing_path, max_chars):
+    """프로젝트 파일의 grouped 섹션 시간으로 번역을 병합하고 translated 섹션과 SRT를 씁니다."""
+    print(f"프로젝트 파일 로드 중: {project_path}", file=sys.stderr)
+    with telemetry.span('merge.parse'), ProjectFile(project_path) as project:
+        spans = project.section(GROUPED).spans()
+    if telemetry.enabled():
+        telemetry.count('bytes.read', os.path.getsize(project_path), stage='merge')
+    telemetry.current_span().set_attribute('cues_in', len(spans))
+
+    if len(spans) != len(translated_texts):
+        error_msg = f"자막 개수 불일치: 프로젝트 {len(spans)}개 vs 번역 {len(translated_texts)}개"
+        print(f"오류: {error_msg}", file=sys.stderr)
+        return {
+            'success': False,
+            'error': error_msg,
+            'subtitle_count': 0,
+            'output_path': None
+        }
+
+    if word_timing_path:
+        with telemetry.span('merge.retime'):
+            timeline = load_word_timing(word_timing_path)
+            cues = retime_groups(timeline, spans, translated_texts, max_chars)
+        spans = [(start, end) for start, end, _ in cues]
+        translated_texts = [text for _, _, text in cues]
+        print(f"✓ 단어 타이밍으로 {len(cues)}개 자막으로 조정했습니다.", file=sys.stderr)
+
+    with telemetry.span('merge.save'):
+        update_project(project_path, {TRANSLATED: (spans, translated_texts)})
+        with ProjectFile(project_path) as project:
+            export_srt(project.section(TRANSLATED), output_srt_path)
+    if telemetry.enabled():
+        telemetry.count('bytes.written', os.path.getsize(project_path), stage='merge')
+        telemetry.count('bytes.written', os.path.getsize(output_srt_path), stage='merge')
+    telemetry.count('cues.processed', len(translated_texts), stage='merge')
+    print(f"✓ 번역 섹션 저장 완료: {project_path}", file=sys.stderr)
+    print(f"✓ 번역된 자막 저장 완료: {output_srt_path}", file=sys.stderr)
+
+    return {
+        'success': True,
+        'subtitle_count': len(translated_texts),
+        'output_path': output_srt_path,
+        'project_path': project_path
+    }
+
+
+def _build_srt(cues):
+    """[(시작 ms, 종료 ms, 텍스트), ...]로 SubRipFile을 만듭니다."""
+    return pysrt.SubRipFile([
+        pysrt.SubRipItem(index=i + 1, start=pysrt.SubRipTime(milliseconds=start),
+                         end=pysrt.SubRipTime(milliseconds=end), text=text)
+        for i, (start, end, text) in enumerate(cues)
+    ])
+
+
+def load_grouped_spans(original_srt_path):
+    """
+    원본 SRT를 extract_subtitle_text.py와 같은 방식으로 전처리하여 그룹별 시간을 돌려줍니다.
+
+    Returns:
+        list: [[시작 ms, 종료 ms], ...] (subtitle_texts.json의 timings와 같은 형식)
+    """
+    with telemetry.span('merge.parse'):
+        subs = pysrt.open(original_srt_path)
+    subs = group_subtitles(remove_short_duplicates(fix_overlapping_subtitles(subs)))
+    return [[sub.start.ordinal, sub.end.ordinal] for sub in subs]
+
+
+@telemetry.traced('merge')
+def write_translated_srt(timings, translated_texts, output_srt_path):
+    """
+    이미 전처리된 그룹 시간과 번역된 텍스트로 SRT 파일을 생성합니다.
+    원본 SRT를 다시 해석하지 않으므로 여러 언어를 만들 때 timings 하나를 재사용할 수 있습니다.
+
+    Args:
+        timings (list): [[시작 ms, 종료 ms], ...] (subtitle_texts.json의 timings)
+        translated_texts (list): 번역된 텍스트 리스트
+        output_srt_path (str): 출력 SRT 파일 경로
+
+    Returns:
+        dict: {
+            'success': bool,
+            'subtitle_count': int,
+            'output_path': str
+        }
+    """
+    if len(timings) != len(translated_texts):
+        error_msg = f"자막 개수 불일치: 원본 {len(timings)}개 vs 번역 {len(translated_texts)}개"
+        print(f"오류: {error_msg}", file=sys.stderr)
+        return {
+            'success': False,
+            'error': error_msg,
+            'subtitle_count': 0,
+            'output_path': None
+        }
+
+    with telemetry.span('merge.save'):
+        _build_srt([
+            (start, end, text) for (start, end), text in zip(timings, translated_texts)
+        ]).save(output_srt_path, encoding='utf-8')
+    if telemetry.enabled():
+        telemetry.count('bytes.written', os.path.getsize(output_srt_path), stage='merge')
+    telemetry.count('cues.processed', len(translated_texts), stage='merge')
+    print(f"✓ 번역된 자막 저장 완료: {output_srt_path}", file=sys.stderr)
+
+    return {
+        'success': True,
+        'subtitle_count': len(translated_texts),
+        'output_path': output_srt_path
+    }
+
+
+def _pop_option(args, name):
+    """args에서 '--name 값' 옵션을 꺼내 값을 반환합니다."""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args) or args[index + 1].startswith('--'):
+        print(f"오류: {name} 뒤에 값을 지정하세요.", file=sys.stderr)
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: python merge_translated_subtitle.py <original_srt> <translated_json> <output_srt>", file=sys.stderr)
+    args = sys.argv[1:]
+    profile = '--profile' in args
+    if profile:
+        args.remove('--profile')
+    profile_memory = '--profile-memory' in args
+    if profile_memory:
+        args.remove('--profile-memory')
+
+    word_timing_path = _pop_option(args, '--word-timing')
+
+    if len(args) < 3:
+        print("Usage: python merge_translated_subtitle.py <original_srt_or_project> <translated_json> <output_srt> [--word-timing <json3_or_vtt>] [--profile | --profile-memory]", file=sys.stderr)
         print("\nExample:", file=sys.stderr)
         print('  python merge_translated_subtitle.py video.en.srt translated.json video.ko.srt', file=sys.stderr)
+        print('  python merge_translated_subtitle.py video.en.srt translated.json video.ko.srt --word-timing video.en.json3', file=sys.stderr)
+        print('  python merge_translated_subtitle.py video.ytkr translated.json video.ko.srt', file=sys.stderr)
         print("\ntranslated_json should be a JSON array of translated strings", file=sys.stderr)
         sys.exit(1)
 
-    original_srt = sys.argv[1]
-    translated_json_path = sys.argv[2]
-    output_srt = sys.argv[3]
+    original_srt = args[0]
+    translated_json_path = args[1]
+    output_srt = args[2]
 
-    # 번역된 텍스트 로드
-    with open(translated_json_path, 'r', encoding='utf-8') as f:
-        translated_texts = json.load(f)
+    # --profile: 출력 SRT 옆에 프로파일 보고서와 collapsed stack 저장
+    # --profile-memory: 출력 SRT 옆에 메모리 할당 보고서 저장
+    with maybe_profile(profile, 'merge_translated_subtitle', os.path.dirname(os.path.abspath(output_srt)),
+                       memory=profile_memory):
+        # 번역된 텍스트 로드
+        with open(translated_json_path, 'r', encoding='utf-8') as f:
+            translated_texts = json.load(f)
 
-    if not isinstance(translated_texts, list):
-        print("오류: translated_json은 문자열 배열이어야 합니다.", file=sys.stderr)
-        sys.exit(1)
+        if not isinstance(translated_texts, list):
+            print("오류: translated_json은 문자열 배열이어야 합니다.", file=sys.stderr)
+            sys.exit(1)
 
-    result = merge_translated_subtitle(original_srt, translated_texts, output_srt)
+        result = merge_translated_subtitle(original_srt, translated_texts, output_srt,
+                                           word_timing_path=word_timing_path)
 
     # 결과 출력
     print(json.dumps(result, indent=2, ensure_ascii=False))
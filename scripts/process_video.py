@@ -2,27 +2,136 @@
 import sys
 import os
 import subprocess
+import tempfile
 import json
 
+import telemetry
+from media_probe import (
+    probe_media, plan_encode, encode_fingerprint, is_up_to_date, MediaProbeError
+)
+from project_format import TRANSLATED, ProjectFile, ProjectFormatError, export_srt, is_project
 
-def burn_subtitles(video_path, subtitle_path, output_path, font_name="Arial", font_size=20):
+
+def subtitle_filter(subtitle_path, font_name="Arial", font_size=20):
+    """자막 파일과 폰트 설정으로 FFmpeg subtitles 필터 문자열을 만듭니다."""
+    # 자막 파일 경로를 절대 경로로 변환하고 이스케이프 처리
+    subtitle_path_escaped = os.path.abspath(subtitle_path).replace('\\', '/').replace(':', '\\:')
+
+    return (
+        f"subtitles='{subtitle_path_escaped}':"
+        f"force_style='FontName={font_name},"
+        f"FontSize={font_size},"
+        f"PrimaryColour=&HFFFFFF,"  # 흰색
+        f"OutlineColour=&H000000,"  # 검은색 테두리
+        f"Outline=2,"  # 테두리 두께
+        f"BackColour=&H80000000,"  # 반투명 검은색 배경
+        f"MarginV=20'"  # 하단 여백
+    )
+
+
+def _plan_or_default(video_path, output_path, target_height=None, encoder=None):
+    """입력 영상 조사 후 인코딩 방식을 결정합니다. (ffprobe가 없으면 기존 방식으로 진행)"""
+    try:
+        plan = plan_encode(probe_media(video_path), output_path, target_height, encoder)
+        print(f"  인코더: {plan['video_encoder']}, "
+              f"출력 해상도: {plan['output_width']}x{plan['output_height']}, "
+              f"오디오: {' '.join(plan['audio_args'][1:]) or '없음'}", file=sys.stderr)
+        print(f"  예상 소요 시간: 약 {plan['estimated_seconds']:.0f}초", file=sys.stderr)
+        return plan
+    except MediaProbeError as e:
+        print(f"⚠ 영상 정보 조사 실패, 기본 설정으로 인코딩합니다: {e}", file=sys.stderr)
+        return {
+            'video_encoder': encoder,
+            'pre_filters': [f"scale=-2:{target_height}"] if target_height else [],
+            'audio_args': ['-c:a', 'copy'],
+        }
+
+
+def run_ffmpeg(command, progress=None):
+    """
+    FFmpeg를 실행합니다. progress가 주어지면 '-progress pipe:1' 출력을 읽어
+    진행 상황 블록({'frame': '120', 'fps': '48.2', 'out_time_us': ..., 'progress': 'continue'})마다 호출합니다.
+
+    Raises:
+        subprocess.CalledProcessError: FFmpeg가 실패했을 때 (stderr 포함)
+    """
+    if progress is None:
+        return subprocess.run(command, check=True, capture_output=True, text=True)
+
+    command = command[:1] + ['-progress', 'pipe:1', '-nostats'] + command[1:]
+    # stderr는 파일로 받아 파이프 버퍼가 가득 차서 멈추는 일을 막습니다.
+    with tempfile.TemporaryFile(mode='w+') as stderr_file:
+        with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file, text=True) as process:
+            block = {}
+            for line in process.stdout:
+                key, _, value = line.strip().partition('=')
+                block[key] = value
+                if key == 'progress':
+                    progress(block)
+                    block = {}
+        stderr_file.seek(0)
+        stderr = stderr_file.read()
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr)
+    return subprocess.CompletedProcess(command, 0, stderr=stderr)
+
+
+@telemetry.traced('burn')
+def burn_subtitles(video_path, subtitle_path, output_path, font_name="Arial", font_size=20,
+                   target_height=None, encoder=None, force=False, threads=None, progress=None):
     """
     영상에 자막을 하드코딩(burn-in)합니다.
 
+    인코딩 전에 ffprobe로 입력 영상을 조사하여 인코더, 축소 여부, 오디오 복사 여부를 정하고
+    예상 소요 시간을 출력합니다. 출력 파일이 이미 같은 입력과 설정으로 만든 결과이면 건너뜁니다.
+
     Args:
         video_path (str): 입력 영상 파일 경로
-        subtitle_path (str): 자막 파일 경로
+        subtitle_path (str): 자막 파일 경로 (프로젝트 파일이면 translated 섹션을 임시 SRT로 내보내 사용)
         output_path (str): 출력 영상 파일 경로
         font_name (str): 폰트 이름
         font_size (int): 폰트 크기
+        target_height (int): 지정하면 이보다 큰 영상은 자막 합성 전에 이 높이로 축소
+        encoder (str): 영상 인코더 (None이면 자동 선택)
+        force (bool): True이면 최신 출력 파일이 있어도 다시 인코딩
+        threads (int): 디코더/필터/인코더 각각의 스레드 수 (None이면 FFmpeg 기본값, encode_pool.py에서 지정)
+        progress (callable): FFmpeg 진행 상황 블록을 받을 함수 (run_ffmpeg 참고)
 
     Returns:
         dict: {
             'success': bool,
             'output_path': str,
-            'file_size_mb': float
+            'file_size_mb': float,
+            'skipped': bool,
+            'encode_plan': dict or None   # 건너뛴 경우 None
         }
     """
+    if is_project(subtitle_path):
+        # FFmpeg subtitles 필터는 파일 경로가 필요하므로 translated 섹션을 임시 SRT로 내보냅니다.
+        with tempfile.NamedTemporaryFile('w', suffix='.srt', delete=False) as f:
+            exported_path = f.name
+        try:
+            with ProjectFile(subtitle_path) as project:
+                export_srt(project.section(TRANSLATED), exported_path)
+            return _burn_subtitles(video_path, exported_path, output_path, font_name, font_size,
+                                   target_height, encoder, force, threads, progress)
+        except ProjectFormatError as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'output_path': None
+            }
+        finally:
+            os.remove(exported_path)
+
+    return _burn_subtitles(video_path, subtitle_path, output_path, font_name, font_size,
+                           target_height, encoder, force, threads, progress)
+
+
+def _burn_subtitles(video_path, subtitle_path, output_path, font_name, font_size,
+                    target_height, encoder, force, threads, progress):
+    """burn_subtitles() 본체 (subtitle_path는 SRT 파일)"""
     if not os.path.exists(video_path):
         return {
             'success': False,
@@ -45,47 +154,65 @@ def burn_subtitles(video_path, subtitle_path, output_path, font_name="Arial", fo
     print(f"  자막 파일: {subtitle_path}", file=sys.stderr)
     print(f"  출력 영상: {output_path}", file=sys.stderr)
 
-    # 자막 파일 경로를 절대 경로로 변환하고 이스케이프 처리
-    subtitle_path_escaped = os.path.abspath(subtitle_path).replace('\\', '/').replace(':', '\\:')
+    fingerprint = encode_fingerprint(video_path, subtitle_path, {
+        'font_name': font_name,
+        'font_size': font_size,
+        'target_height': target_height,
+        'encoder': encoder,
+    })
+    if not force and is_up_to_date(video_path, output_path, fingerprint):
+        file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print("✓ 출력 영상이 이미 최신 상태입니다. 인코딩을 건너뜁니다.", file=sys.stderr)
+        telemetry.current_span().set_attribute('skipped', True)
+        return {
+            'success': True,
+            'output_path': output_path,
+            'file_size_mb': round(file_size_mb, 2),
+            'skipped': True,
+            'encode_plan': None
+        }
+
+    with telemetry.span('burn.probe'):
+        plan = _plan_or_default(video_path, output_path, target_height, encoder)
+    telemetry.current_span().set_attribute('encoder', plan['video_encoder'])
 
     # FFmpeg 명령어 구성
-    filter_complex = (
-        f"subtitles='{subtitle_path_escaped}':"
-        f"force_style='FontName={font_name},"
-        f"FontSize={font_size},"
-        f"PrimaryColour=&HFFFFFF,"  # 흰색
-        f"OutlineColour=&H000000,"  # 검은색 테두리
-        f"Outline=2,"  # 테두리 두께
-        f"BackColour=&H80000000,"  # 반투명 검은색 배경
-        f"MarginV=20'"  # 하단 여백
-    )
+    filters = plan['pre_filters'] + [subtitle_filter(subtitle_path, font_name, font_size)]
 
-    command = [
-        'ffmpeg',
-        '-i', video_path,
-        '-vf', filter_complex,
-        '-c:a', 'copy',  # 오디오는 복사 (재인코딩 안 함)
+    command = ['ffmpeg']
+    if threads:
+        # -i 앞의 -threads는 디코더, 뒤의 -threads는 인코더에 적용됩니다.
+        command += ['-filter_threads', str(threads), '-threads', str(threads)]
+    command += ['-i', video_path, '-vf', ','.join(filters)]
+    if plan['video_encoder']:
+        command += ['-c:v', plan['video_encoder']]
+    if threads:
+        command += ['-threads', str(threads)]
+    command += plan['audio_args']
+    command += [
+        '-metadata', f'comment={fingerprint}',  # 재실행 시 같은 결과인지 확인용
         '-y',  # 기존 파일 덮어쓰기
         output_path
     ]
 
     try:
         print("FFmpeg 실행 중... (시간이 걸릴 수 있습니다)", file=sys.stderr)
-        result = subprocess.run(
-            command,
-            check=True,
-            capture_output=True,
-            text=True
-        )
+        with telemetry.span('burn.ffmpeg', threads=threads or 0):
+            run_ffmpeg(command, progress)
 
         file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        if telemetry.enabled():
+            telemetry.count('bytes.read', os.path.getsize(video_path), stage='burn')
+            telemetry.count('bytes.written', os.path.getsize(output_path), stage='burn')
         print(f"✓ 자막 삽입 완료!", file=sys.stderr)
         print(f"✓ 파일 크기: {file_size_mb:.2f} MB", file=sys.stderr)
 
         return {
             'success': True,
             'output_path': output_path,
-            'file_size_mb': round(file_size_mb, 2)
+            'file_size_mb': round(file_size_mb, 2),
+            'skipped': False,
+            'encode_plan': plan
         }
 
     except subprocess.CalledProcessError as e:
@@ -98,6 +225,131 @@ def burn_subtitles(video_path, subtitle_path, output_path, font_name="Arial", fo
         }
 
 
+def build_fanout_command(video_path, outputs, plan):
+    """
+    영상을 한 번만 디코딩하여 여러 자막 버전을 만드는 FFmpeg 명령어를 구성합니다.
+
+    [0:v] → (축소) → split=N → 분기마다 subtitles 필터 → 출력 N개
+
+    Args:
+        video_path (str): 입력 영상 파일 경로
+        outputs (list): [{'subtitle_path', 'output_path', 'font_name', 'font_size', 'fingerprint'}, ...]
+        plan (dict): plan_encode() 결과 (모든 출력에 같은 인코더/오디오 설정 사용)
+
+    Returns:
+        list: FFmpeg 명령어 인자 리스트
+    """
+    count = len(outputs)
+    branches = ''.join(f"[s{i}]" for i in range(count))
+    graph = ['[0:v]' + ','.join(plan['pre_filters'] + [f"split={count}"]) + branches]
+    for i, output in enumerate(outputs):
+        graph.append(
+            f"[s{i}]"
+            + subtitle_filter(output['subtitle_path'], output['font_name'], output['font_size'])
+            + f"[v{i}]"
+        )
+
+    command = ['ffmpeg', '-y', '-i', video_path, '-filter_complex', ';'.join(graph)]
+    for i, output in enumerate(outputs):
+        command += ['-map', f"[v{i}]", '-map', '0:a?']
+        if plan['video_encoder']:
+            command += ['-c:v', plan['video_encoder']]
+        command += plan['audio_args']
+        command += ['-metadata', f"comment={output['fingerprint']}", output['output_path']]
+    return command
+
+
+@telemetry.traced('burn_multi')
+def burn_subtitles_multi(video_path, outputs, target_height=None, encoder=None, force=False):
+    """
+    하나의 영상에 여러 언어 자막을 각각 합성합니다. 원본은 한 번만 디코딩합니다.
+
+    Args:
+        video_path (str): 입력 영상 파일 경로
+        outputs (list): [{'subtitle_path', 'output_path', 'font_name'(선택), 'font_size'(선택)}, ...]
+        target_height (int): 지정하면 이보다 큰 영상은 분기 전에 한 번만 축소
+        encoder (str): 영상 인코더 (None이면 자동 선택)
+        force (bool): True이면 최신 출력 파일이 있어도 다시 인코딩
+
+    Returns:
+        dict: {
+            'success': bool,
+            'outputs': [{'output_path', 'file_size_mb', 'skipped'}],
+            'encode_plan': dict or None   # 모두 건너뛴 경우 None
+        }
+    """
+    if not os.path.exists(video_path):
+        return {
+            'success': False,
+            'error': f"영상 파일을 찾을 수 없습니다: {video_path}",
+            'outputs': []
+        }
+
+    pending = []
+    results = []
+    for output in outputs:
+        if not os.path.exists(output['subtitle_path']):
+            return {
+                'success': False,
+                'error': f"자막 파일을 찾을 수 없습니다: {output['subtitle_path']}",
+                'outputs': []
+            }
+
+        output = dict(output)
+        output.setdefault('font_name', "Arial")
+        output.setdefault('font_size', 20)
+        output['fingerprint'] = encode_fingerprint(video_path, output['subtitle_path'], {
+            'font_name': output['font_name'],
+            'font_size': output['font_size'],
+            'target_height': target_height,
+            'encoder': encoder,
+        })
+        os.makedirs(os.path.dirname(output['output_path']) or '.', exist_ok=True)
+
+        if not force and is_up_to_date(video_path, output['output_path'], output['fingerprint']):
+            print(f"✓ 이미 최신 상태, 건너뜁니다: {output['output_path']}", file=sys.stderr)
+            results.append({'output_path': output['output_path'], 'skipped': True})
+        else:
+            pending.append(output)
+
+    plan = None
+    if pending:
+        print(f"자막 삽입 시작... ({len(pending)}개 버전, 원본 1회 디코딩)", file=sys.stderr)
+        print(f"  입력 영상: {video_path}", file=sys.stderr)
+        plan = _plan_or_default(video_path, pending[0]['output_path'], target_height, encoder)
+
+        command = build_fanout_command(video_path, pending, plan)
+        try:
+            print("FFmpeg 실행 중... (시간이 걸릴 수 있습니다)", file=sys.stderr)
+            with telemetry.span('burn.ffmpeg', outputs=len(pending)):
+                subprocess.run(command, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            error_msg = f"FFmpeg 오류: {e.stderr}"
+            print(error_msg, file=sys.stderr)
+            return {
+                'success': False,
+                'error': error_msg,
+                'outputs': results
+            }
+
+        for output in pending:
+            print(f"✓ 자막 삽입 완료: {output['output_path']}", file=sys.stderr)
+            results.append({'output_path': output['output_path'], 'skipped': False})
+
+    for result in results:
+        result['file_size_mb'] = round(os.path.getsize(result['output_path']) / (1024 * 1024), 2)
+        if not result['skipped'] and telemetry.enabled():
+            telemetry.count('bytes.written', os.path.getsize(result['output_path']), stage='burn')
+    if pending and telemetry.enabled():
+        telemetry.count('bytes.read', os.path.getsize(video_path), stage='burn')
+
+    return {
+        'success': True,
+        'outputs': results,
+        'encode_plan': plan
+    }
+
+
 def check_ffmpeg():
     """FFmpeg가 설치되어 있는지 확인합니다."""
     try:
@@ -112,9 +364,30 @@ def check_ffmpeg():
         return False
 
 
+def _pop_option(args, name):
+    """args에서 '--name 값' 옵션을 꺼내 값을 반환합니다."""
+    if name not in args:
+        return None
+    index = args.index(name)
+    if index + 1 >= len(args):
+        print(f"오류: {name} 뒤에 값을 지정하세요.", file=sys.stderr)
+        sys.exit(1)
+    value = args[index + 1]
+    del args[index:index + 2]
+    return value
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 4:
-        print("Usage: python process_video.py <video_path> <subtitle_path> <output_path> [font_name] [font_size]", file=sys.stderr)
+    args = sys.argv[1:]
+    force = '--force' in args
+    if force:
+        args.remove('--force')
+    target_height = _pop_option(args, '--height')
+    encoder = _pop_option(args, '--encoder')
+
+    if len(args) < 3:
+        print("Usage: python process_video.py <video_path> <subtitle_path> <output_path> [font_name] [font_size] "
+              "[--height <px>] [--encoder <name>] [--force]", file=sys.stderr)
         print("\nExample:", file=sys.stderr)
         print('  python process_video.py input.mp4 subtitle.srt output.mp4 Arial 24', file=sys.stderr)
         sys.exit(1)
@@ -127,13 +400,18 @@ if __name__ == "__main__":
         print("  Ubuntu: sudo apt-get install ffmpeg", file=sys.stderr)
         sys.exit(1)
 
-    video_path = sys.argv[1]
-    subtitle_path = sys.argv[2]
-    output_path = sys.argv[3]
-    font_name = sys.argv[4] if len(sys.argv) > 4 else "Arial"
-    font_size = int(sys.argv[5]) if len(sys.argv) > 5 else 20
+    video_path = args[0]
+    subtitle_path = args[1]
+    output_path = args[2]
+    font_name = args[3] if len(args) > 3 else "Arial"
+    font_size = int(args[4]) if len(args) > 4 else 20
 
-    result = burn_subtitles(video_path, subtitle_path, output_path, font_name, font_size)
+    result = burn_subtitles(
+        video_path, subtitle_path, output_path, font_name, font_size,
+        target_height=int(target_height) if target_height else None,
+        encoder=encoder,
+        force=force
+    )
 
     # JSON 형식으로 결과 출력
     print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,371 @@
+"""자막 작업 중간 결과를 저장하는 바이너리 프로젝트 파일 (.ytkr)
+
+subtitle_texts.json, translated_texts.json, SRT를 단계마다 전부 다시 읽고 해석하는 대신
+하나의 파일을 mmap으로 열어 필요한 자막만 바로 읽습니다. (자막 i번 접근은 O(1))
+
+파일 구조 (little-endian):
+    header     magic 'YTKRPRJ\\0' (8) | version u16 | section_count u16 | flags u32
+    sections   section_count × [tag (4) | count u32 | timings_offset u64 |
+                                text_offsets_offset u64 | blob_offset u64 | blob_size u64]
+    data       섹션마다 int32 [start_ms, end_ms] × count
+                        uint32 텍스트 시작 위치 × (count + 1)
+                        UTF-8 텍스트 blob
+               (모든 배열은 8바이트 경계에서 시작)
+
+섹션:
+    source      원본 SRT 자막 (전처리 전)
+    grouped     전처리/그룹핑된 자막 (번역 단위, subtitle_texts.json과 같은 내용)
+    translated  번역 자막 (merge_translated_subtitle.py 결과, 단어 타이밍 분할 시 개수가 다를 수 있음)
+    metadata    JSON (원본 경로 등)
+
+사용법:
+    python project_format.py info <project>
+    python project_format.py get <project> <section> <index>
+    python project_format.py export-json <project> <section> [output_json]
+    python project_format.py export-srt <project> <section> <output_srt>
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import itertools
+from array import array
+
+MAGIC = b'YTKRPRJ\0'
+VERSION = 1
+HEADER = struct.Struct('<8sHHI')
+SECTION = struct.Struct('<4sIQQQQ')
+ALIGNMENT = 8
+
+SOURCE = 'source'
+GROUPED = 'grouped'
+TRANSLATED = 'translated'
+METADATA = 'metadata'
+SECTION_TAGS = {
+    SOURCE: b'SRC ',
+    GROUPED: b'GRP ',
+    TRANSLATED: b'TRN ',
+    METADATA: b'META',
+}
+_TAG_NAMES = {tag: name for name, tag in SECTION_TAGS.items()}
+_LITTLE_ENDIAN = sys.byteorder == 'little'
+
+
+class ProjectFormatError(Exception):
+    """프로젝트 파일 형식 오류"""
+
+
+def is_project(path):
+    """파일이 프로젝트 파일(magic 확인)인지 반환합니다."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _int_view(view, typecode):
+    """little-endian 정수 배열 영역을 복사 없이 읽습니다. (big-endian 환경은 복사 후 변환)"""
+    if _LITTLE_ENDIAN:
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+class CueSection:
+    """프로젝트 파일의 자막 섹션 하나 (mmap 위의 읽기 전용 view)"""
+
+    def __init__(self, view, count, timings_offset, offsets_offset, blob_offset, blob_size):
+        self.count = count
+        self.timings = _int_view(view[timings_offset:timings_offset + 8 * count], 'i')
+        self.offsets = _int_view(view[offsets_offset:offsets_offset + 4 * (count + 1)], 'I')
+        self.blob = view[blob_offset:blob_offset + blob_size]
+
+    def __len__(self):
+        return self.count
+
+    def start(self, i):
+        return self.timings[2 * i]
+
+    def end(self, i):
+        return self.timings[2 * i + 1]
+
+    def text(self, i):
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"자막 번호 범위를 벗어났습니다: {i}")
+        return (self.timings[2 * i], self.timings[2 * i + 1], self.text(i))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def texts(self):
+        data = self.blob.tobytes()
+        offsets = self.offsets.tolist()
+        return [data[a:b].decode('utf-8') for a, b in zip(offsets, offsets[1:])]
+
+    def spans(self):
+        """[(start_ms, end_ms), ...]"""
+        timings = self.timings.tolist()
+        return list(zip(timings[0::2], timings[1::2]))
+
+    def release(self):
+        for view in (self.timings, self.offsets, self.blob):
+            if isinstance(view, memoryview):
+                view.release()
+
+
+class ProjectFile:
+    """
+    프로젝트 파일을 mmap으로 엽니다. 섹션 표만 읽으므로 자막 수와 관계없이 바로 열립니다.
+
+    사용 예:
+        with ProjectFile('video.ytkr') as project:
+            grouped = project.section('grouped')
+            start_ms, end_ms, text = grouped[42]
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ProjectFormatError(f"빈 파일입니다: {path}")
+        self._view = memoryview(self._mmap)
+        self._sections = {}
+
+        try:
+            magic, version, section_count, _flags = HEADER.unpack_from(self._view, 0)
+        except struct.error:
+            self.close()
+            raise ProjectFormatError(f"프로젝트 파일 헤더가 올바르지 않습니다: {path}")
+        if magic != MAGIC:
+            self.close()
+            raise ProjectFormatError(f"프로젝트 파일이 아닙니다: {path}")
+        if version > VERSION:
+            self.close()
+            raise ProjectFormatError(f"지원하지 않는 프로젝트 파일 버전입니다: {version}")
+
+        for i in range(section_count):
+            tag, count, timings_offset, offsets_offset, blob_offset, blob_size = \
+                SECTION.unpack_from(self._view, HEADER.size + i * SECTION.size)
+            name = _TAG_NAMES.get(tag)
+            if name is None:
+                continue  # 이후 버전에서 추가된 섹션은 무시
+            if blob_offset + blob_size > len(self._view):
+                self.close()
+                raise ProjectFormatError(f"'{name}' 섹션이 파일 크기를 벗어납니다: {path}")
+            self._sections[name] = CueSection(
+                self._view, count, timings_offset, offsets_offset, blob_offset, blob_size
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    @property
+    def section_names(self):
+        return [name for name in SECTION_TAGS if name in self._sections and name != METADATA]
+
+    def section(self, name):
+        """
+        Raises:
+            ProjectFormatError: 섹션이 없을 때
+        """
+        if name not in self._sections:
+            raise ProjectFormatError(f"'{name}' 섹션이 없습니다: {self.path}")
+        return self._sections[name]
+
+    def metadata(self):
+        if METADATA not in self._sections:
+            return {}
+        return json.loads(str(self._sections[METADATA].blob, 'utf-8'))
+
+    def close(self):
+        for section in self._sections.values():
+            section.release()
+        self._sections = {}
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+            self._mmap.close()
+
+
+def _align(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _encode_section(spans, texts):
+    """(timings bytes, offsets bytes, blob bytes)"""
+    encoded = [text.encode('utf-8') for text in texts]
+    timings = array('i', itertools.chain.from_iterable(spans))
+    offsets = array('I', itertools.accumulate((len(b) for b in encoded), initial=0))
+    if not _LITTLE_ENDIAN:
+        timings.byteswap()
+        offsets.byteswap()
+    return timings.tobytes(), offsets.tobytes(), b''.join(encoded)
+
+
+def write_project(path, sections, metadata=None):
+    """
+    프로젝트 파일을 씁니다. (임시 파일에 쓴 뒤 교체하므로 중간에 실패해도 기존 파일은 그대로입니다)
+
+    Args:
+        path (str): 프로젝트 파일 경로
+        sections (dict): {섹션 이름: (spans, texts)}
+                         spans = [(start_ms, end_ms), ...], texts = [str, ...] (같은 길이)
+        metadata (dict): 함께 저장할 JSON 값
+    """
+    payloads = []
+    for name, (spans, texts) in sections.items():
+        if name not in SECTION_TAGS or name == METADATA:
+            raise ValueError(f"알 수 없는 섹션입니다: {name}")
+        if len(spans) != len(texts):
+            raise ValueError(f"'{name}' 섹션의 시간({len(spans)}개)과 텍스트({len(texts)}개) 개수가 다릅니다.")
+        payloads.append((SECTION_TAGS[name], len(texts)) + _encode_section(spans, texts))
+    if metadata is not None:
+        blob = json.dumps(metadata, ensure_ascii=False).encode('utf-8')
+        payloads.append((SECTION_TAGS[METADATA], 0, b'', array('I', [0]).tobytes(), blob))
+
+    table = []
+    chunks = []
+    position = _align(HEADER.size + SECTION.size * len(payloads))
+    for tag, count, timings, offsets, blob in payloads:
+        entry = [tag, count]
+        for data in (timings, offsets, blob):
+            entry.append(position)
+            chunks.append((position, data))
+            position = _align(position + len(data))
+        entry.append(len(blob))
+        table.append(entry)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(payloads), 0))
+        for entry in table:
+            f.write(SECTION.pack(*entry))
+        for offset, data in chunks:
+            f.seek(offset)
+            f.write(data)
+        f.truncate(max(position, f.tell()))
+    os.replace(tmp_path, path)
+
+
+def update_project(path, sections, metadata=None):
+    """
+    기존 프로젝트 파일의 섹션 일부를 교체하거나 추가합니다. (metadata는 기존 값에 병합)
+    grouped 섹션의 텍스트가 바뀌면 기존 translated 섹션은 더 이상 맞지 않으므로 지웁니다.
+    """
+    merged = {}
+    merged_metadata = {}
+    if os.path.exists(path):
+        with ProjectFile(path) as project:
+            for name in project.section_names:
+                section = project.section(name)
+                merged[name] = (section.spans(), section.texts())
+            merged_metadata = project.metadata()
+
+    if (GROUPED in sections and TRANSLATED not in sections and GROUPED in merged and
+            merged[GROUPED][1] != list(sections[GROUPED][1])):
+        print("⚠ 그룹핑 결과가 바뀌어 기존 번역 섹션을 삭제합니다.", file=sys.stderr)
+        merged.pop(TRANSLATED, None)
+
+    merged.update(sections)
+    merged_metadata.update(metadata or {})
+    write_project(path, merged, merged_metadata)
+
+
+def format_srt_time(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+
+
+def export_srt(section, output_path):
+    """섹션을 SRT 파일로 저장합니다."""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for i, (start, end, text) in enumerate(section):
+            f.write(f"{i + 1}\n{format_srt_time(start)} --> {format_srt_time(end)}\n{text}\n\n")
+    return output_path
+
+
+def export_json(section, name):
+    """
+    섹션을 기존 JSON 형식으로 변환합니다.
+    translated는 translated_texts.json 형식(문자열 배열), 나머지는 subtitle_texts.json 형식입니다.
+    """
+    if name == TRANSLATED:
+        return section.texts()
+    return {
+        'texts': section.texts(),
+        'timings': [list(span) for span in section.spans()],
+        'metadata': {
+            'total_count': len(section),
+            'processed_count': len(section)
+        }
+    }
+
+
+if __name__ == "__main__":
+    commands = ('info', 'get', 'export-json', 'export-srt')
+    if len(sys.argv) < 3 or sys.argv[1] not in commands:
+        print("Usage: python project_format.py info <project>", file=sys.stderr)
+        print("       python project_format.py get <project> <section> <index>", file=sys.stderr)
+        print("       python project_format.py export-json <project> <section> [output_json]", file=sys.stderr)
+        print("       python project_format.py export-srt <project> <section> <output_srt>", file=sys.stderr)
+        sys.exit(1)
+
+    command, project_path = sys.argv[1], sys.argv[2]
+    try:
+        with ProjectFile(project_path) as project:
+            if command == 'info':
+                result = {
+                    'path': project_path,
+                    'size': os.path.getsize(project_path),
+                    'sections': {name: len(project.section(name)) for name in project.section_names},
+                    'metadata': project.metadata(),
+                }
+            else:
+                if len(sys.argv) < 4:
+                    print("오류: 섹션 이름을 지정하세요. (source, grouped, translated)", file=sys.stderr)
+                    sys.exit(1)
+                name = sys.argv[3]
+                section = project.section(name)
+
+                if command == 'get':
+                    start, end, text = section[int(sys.argv[4])]
+                    result = {'start_ms': start, 'end_ms': end, 'text': text}
+                elif command == 'export-srt':
+                    if len(sys.argv) < 5:
+                        print("오류: 출력 SRT 경로를 지정하세요.", file=sys.stderr)
+                        sys.exit(1)
+                    export_srt(section, sys.argv[4])
+                    print(f"✓ {len(section)}개 자막을 저장했습니다: {sys.argv[4]}", file=sys.stderr)
+                    sys.exit(0)
+                else:
+                    result = export_json(section, name)
+                    if len(sys.argv) > 4:
+                        with open(sys.argv[4], 'w', encoding='utf-8') as f:
+                            json.dump(result, f, ensure_ascii=False, indent=2)
+                        print(f"✓ {len(section)}개 항목을 저장했습니다: {sys.argv[4]}", file=sys.stderr)
+                        sys.exit(0)
+    except (OSError, ProjectFormatError, IndexError, ValueError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
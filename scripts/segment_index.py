@@ -0,0 +1,342 @@
+"""여러 영상에서 반복되는 자막 구간의 번역을 재사용하는 인덱스 스크립트
+
+채널마다 같은 인트로, 스폰서 멘트, 아웃트로가 수백 개의 영상에 반복됩니다.
+이미 번역·검수가 끝난 영상의 구간(group_subtitles 결과)을 인덱스에 넣어두면,
+새 영상의 같은 구간은 번역기를 호출하기 전에 저장된 번역으로 채워집니다.
+
+- 정확히 같은 구간: 정규화된 텍스트의 해시로 O(1) 조회 → 번역을 그대로 채움
+- 거의 같은 구간 (fuzzy=True일 때만): 단어 shingle의 MinHash + LSH 밴드로 후보를 찾고
+  실제 shingle 유사도로 검증. 숫자(가격, 날짜, 수량 등)나 그 기호가 하나라도 다르면 제외합니다.
+  비슷한 구간의 번역은 그대로 쓰면 틀릴 수 있으므로 채우지 않고 검토용 제안으로만 돌려줍니다.
+
+인덱스는 JSON Lines 파일(segments.jsonl)에 추가 쓰기만 하므로
+새 영상의 번역을 넣을 때 기존 인덱스를 다시 쓰지 않습니다.
+"""
+import os
+import re
+import sys
+import json
+import zlib
+import random
+import hashlib
+
+NUM_PERM = 32
+BANDS = 8
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 2
+DEFAULT_THRESHOLD = 0.9
+MIN_WORDS_FOR_FUZZY = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# 시드를 고정하여 실행할 때마다 같은 MinHash 서명이 나오게 합니다.
+_rng = random.Random(20240101)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+# 통화·퍼센트·부호 기호는 뜻을 바꾸므로 지우지 않습니다. ("$5" vs "5%")
+_SYMBOLS = r"$€£¥₩%+\-"
+_PUNCT_RE = re.compile(r"[^\w\s'" + _SYMBOLS + r"]+")
+_SPACE_RE = re.compile(r'\s+')
+_TERMINAL_RE = re.compile(r'([?!]+)[^\w?!]*$')
+_NUMBER_RE = re.compile(r"[" + _SYMBOLS + r"]*\d+[" + _SYMBOLS + r"]*")
+
+
+def normalize_text(text):
+    """
+    대소문자, 문장 부호, 공백 차이를 없앤 비교용 텍스트를 만듭니다.
+    통화·퍼센트·부호 기호와 문장 끝의 ?/!는 뜻을 바꾸므로 남깁니다.
+    """
+    text = text.replace('\n', ' ').lower()
+    terminal = _TERMINAL_RE.search(text)
+    text = _SPACE_RE.sub(' ', _PUNCT_RE.sub(' ', text)).strip()
+    if terminal and text:
+        text = f"{text} {terminal.group(1)}"
+    return text
+
+
+def text_key(normalized):
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def _shingles(normalized):
+    words = normalized.split()
+    if len(words) < SHINGLE_SIZE:
+        return {normalized}
+    return {
+        ' '.join(words[i:i + SHINGLE_SIZE])
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash_signature(normalized):
+    """단어 shingle 집합의 MinHash 서명을 계산합니다."""
+    hashes = [zlib.crc32(s.encode('utf-8')) for s in _shingles(normalized)]
+    return [
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    ]
+
+
+def estimate_similarity(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def jaccard_similarity(shingles_a, shingles_b):
+    if not shingles_a or not shingles_b:
+        return 0.0
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def _band_keys(signature):
+    return [
+        (band, tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+        for band in range(BANDS)
+    ]
+
+
+class SegmentIndex:
+    """
+    검수된 자막 구간 번역을 보관하는 인덱스.
+
+    Args:
+        index_dir (str): 인덱스 디렉토리 (segments.jsonl 저장)
+        target_lang (str): 번역 대상 언어 (언어별로 분리하여 조회)
+    """
+
+    def __init__(self, index_dir, target_lang='ko'):
+        self.index_dir = index_dir
+        self.target_lang = target_lang
+        self.path = os.path.join(index_dir, 'segments.jsonl')
+        self.records = []
+        self.exact = {}
+        self.buckets = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                if record['lang'] == self.target_lang:
+                    self._index_record(record)
+
+    def _index_record(self, record):
+        position = len(self.records)
+        self.records.append(record)
+        self.exact[record['key']] = position
+        if record.get('minhash'):
+            for band_key in _band_keys(record['minhash']):
+                self.buckets.setdefault(band_key, []).append(position)
+
+    def add(self, source_texts, translated_texts, video_id=None):
+        """
+        검수된 번역을 인덱스에 추가합니다. 이미 있는 구간은 건너뜁니다.
+
+        Returns:
+            int: 새로 추가된 구간 수
+        """
+        if len(source_texts) != len(translated_texts):
+            raise ValueError(
+                f"원문 {len(source_texts)}개와 번역 {len(translated_texts)}개의 개수가 다릅니다."
+            )
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        added = 0
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for source, translated in zip(source_texts, translated_texts):
+                normalized = normalize_text(source)
+                if not normalized or not translated.strip():
+                    continue
+                key = text_key(normalized)
+                if key in self.exact:
+                    continue
+
+                words = normalized.split()
+                record = {
+                    'key': key,
+                    'lang': self.target_lang,
+                    'source': source,
+                    'translation': translated,
+                    'video_id': video_id,
+                    'minhash': minhash_signature(normalized)
+                    if len(words) >= MIN_WORDS_FOR_FUZZY else None,
+                }
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                self._index_record(record)
+                added += 1
+
+        return added
+
+    def lookup(self, text, threshold=DEFAULT_THRESHOLD, fuzzy=True):
+        """
+        구간 하나에 대해 저장된 번역을 찾습니다.
+
+        Args:
+            text (str): 원문 구간
+            threshold (float): 비슷한 구간으로 볼 최소 shingle 유사도
+            fuzzy (bool): False면 정확히 같은 구간만 찾습니다.
+
+        Returns:
+            dict or None: {'translation', 'match': 'exact'|'fuzzy', 'similarity', 'video_id'}
+        """
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+
+        position = self.exact.get(text_key(normalized))
+        if position is not None:
+            record = self.records[position]
+            return {
+                'translation': record['translation'],
+                'match': 'exact',
+                'similarity': 1.0,
+                'video_id': record.get('video_id'),
+            }
+
+        if not fuzzy or len(normalized.split()) < MIN_WORDS_FOR_FUZZY:
+            return None
+
+        signature = minhash_signature(normalized)
+        candidates = set()
+        for band_key in _band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+
+        # MinHash(32개 순열)는 후보 선별에만 쓰고, 판정은 실제 shingle 유사도로 합니다.
+        numbers = _NUMBER_RE.findall(normalized)
+        shingles = _shingles(normalized)
+        best = None
+        best_similarity = threshold
+        for position in candidates:
+            record = self.records[position]
+            candidate = normalize_text(record['source'])
+            # 가격, 날짜, 수량처럼 숫자나 단위 기호($, %, -)만 바뀐 구간은 번역도 달라야 하므로 제외
+            if _NUMBER_RE.findall(candidate) != numbers:
+                continue
+            similarity = jaccard_similarity(shingles, _shingles(candidate))
+            if similarity >= best_similarity:
+                best, best_similarity = record, similarity
+
+        if best is None:
+            return None
+        return {
+            'translation': best['translation'],
+            'match': 'fuzzy',
+            'similarity': round(best_similarity, 3),
+            'video_id': best.get('video_id'),
+        }
+
+    def apply(self, texts, threshold=DEFAULT_THRESHOLD, fuzzy=False):
+        """
+        새 영상의 구간 목록에 저장된 번역을 미리 채웁니다.
+        정확히 같은 구간만 채우며, fuzzy=True면 비슷한 구간의 번역을 검토용 제안으로 함께 돌려줍니다.
+        제안이 있는 구간도 pending_indices에 남으므로 그대로 번역기에 넘겨도 됩니다.
+
+        Returns:
+            dict: {
+                'translations': [번역 문자열 또는 None],       # 정확히 같은 구간만
+                'matches': [{'match', 'similarity', 'video_id', 'translation'} 또는 None],
+                'pending_indices': [번역기가 처리해야 할 인덱스],
+                'review_indices': [비슷한 구간의 번역 제안이 있는 인덱스],
+                'report': {...}
+            }
+        """
+        translations = []
+        matches = []
+        pending = []
+        review = []
+        exact_count = fuzzy_count = reused_chars = 0
+        total_chars = sum(len(text) for text in texts)
+
+        for i, text in enumerate(texts):
+            hit = self.lookup(text, threshold, fuzzy=fuzzy)
+            matches.append(hit)
+            if hit is not None and hit['match'] == 'exact':
+                translations.append(hit['translation'])
+                reused_chars += len(text)
+                exact_count += 1
+                continue
+
+            translations.append(None)
+            pending.append(i)
+            if hit is not None:
+                review.append(i)
+                fuzzy_count += 1
+
+        report = {
+            'total_segments': len(texts),
+            'exact_matches': exact_count,
+            'fuzzy_matches': fuzzy_count,
+            'pending_segments': len(pending),
+            'total_chars': total_chars,
+            'reused_chars': reused_chars,
+            'saved_ratio': round(reused_chars / total_chars, 3) if total_chars else 0.0,
+        }
+        return {
+            'translations': translations,
+            'matches': matches,
+            'pending_indices': pending,
+            'review_indices': review,
+            'report': report,
+        }
+
+
+def _load_texts(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['texts'] if isinstance(data, dict) else data
+
+
+if __name__ == "__main__":
+    usage = (
+        "Usage:\n"
+        "  python segment_index.py apply <subtitle_texts.json> <index_dir> [target_lang] [--fuzzy]\n"
+        "  python segment_index.py add <subtitle_texts.json> <translated_texts.json> <index_dir> [video_id] [target_lang]"
+    )
+    if len(sys.argv) < 2 or sys.argv[1] not in ('apply', 'add'):
+        print(usage, file=sys.stderr)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    args = sys.argv[2:]
+    fuzzy = '--fuzzy' in args
+    if fuzzy:
+        args.remove('--fuzzy')
+
+    if command == 'apply':
+        if len(args) < 2:
+            print(usage, file=sys.stderr)
+            sys.exit(1)
+        texts = _load_texts(args[0])
+        index = SegmentIndex(args[1], args[2] if len(args) > 2 else 'ko')
+        result = index.apply(texts, fuzzy=fuzzy)
+        report = result['report']
+        print(f"✓ {report['exact_matches']}/{report['total_segments']}개 구간에 "
+              f"저장된 번역을 적용했습니다. (번역량 {report['saved_ratio'] * 100:.1f}% 절감)", file=sys.stderr)
+        if report['fuzzy_matches']:
+            print(f"  비슷한 구간 {report['fuzzy_matches']}개는 번역 제안만 matches에 넣었습니다. "
+                  f"(review_indices 검토 필요)", file=sys.stderr)
+    else:
+        if len(args) < 3:
+            print(usage, file=sys.stderr)
+            sys.exit(1)
+        texts = _load_texts(args[0])
+        translated = _load_texts(args[1])
+        video_id = args[3] if len(args) > 3 else None
+        index = SegmentIndex(args[2], args[4] if len(args) > 4 else 'ko')
+        try:
+            added = index.add(texts, translated, video_id)
+        except ValueError as e:
+            print(f"오류: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ {added}개 구간을 인덱스에 추가했습니다.", file=sys.stderr)
+        result = {'success': True, 'added': added, 'index_size': len(index.records)}
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
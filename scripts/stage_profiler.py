@@ -0,0 +1,293 @@
+"""자막/병합 단계 프로파일링 스크립트 (--profile 옵션용)
+
+시간과 메모리는 따로 실행해서 측정합니다. tracemalloc은 프레임 1개만 기록해도 객체를 많이 만드는
+자막 처리 단계를 몇 배 느리게 만들어 시간 순위를 왜곡하기 때문입니다.
+
+- 시간 (--profile): cProfile로 함수별 실행 시간을, 샘플링 스레드로 실제 호출 스택을 측정
+    - <stage>.profile.txt: 자체 시간/누적 시간 순위 보고서
+    - <stage>.collapsed: flamegraph.pl, speedscope 등에서 읽을 수 있는 collapsed stack (단위: μs)
+- 메모리 (--profile-memory): tracemalloc으로 코드 위치별 할당을 측정
+    - <stage>.memory.txt: 최대 메모리 시점/종료 시점에 단계 시작보다 늘어난 할당 순위 보고서
+
+collapsed stack은 cProfile 호출 그래프가 아닌 스택 샘플로 만듭니다. @telemetry.traced 함수는 모두
+같은 wrapper 코드 객체를 거치므로 호출 그래프로는 호출 경로를 구분할 수 없기 때문입니다.
+
+사용 예:
+    with maybe_profile(args.profile, 'extract_subtitle_text', output_dir, memory=args.profile_memory):
+        result = extract_subtitle_text(path)
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import contextlib
+import tracemalloc
+
+import telemetry
+
+DEFAULT_TOP = 30
+TRACEMALLOC_FRAMES = 1
+SAMPLE_INTERVAL = 0.001
+MAX_STACK_DEPTH = 64
+# 최대 메모리 시점 스냅샷은 직전 스냅샷보다 이만큼 늘었을 때만 다시 찍습니다.
+PEAK_POLL_INTERVAL = 0.01
+PEAK_SNAPSHOT_GROWTH = 1.1
+
+# 스택에서 생략할 프레임 (모든 계측 함수가 공유하는 wrapper, 측정 도구 자체)
+_TELEMETRY_FILE = os.path.abspath(telemetry.__file__)
+_SKIPPED_FILES = {os.path.abspath(__file__), os.path.abspath(contextlib.__file__)}
+
+
+def _frame_name(func):
+    """pstats 함수 키 (filename, lineno, funcname)를 표시용 이름으로 바꿉니다."""
+    filename, lineno, funcname = func
+    if filename == '~':
+        # 내장 함수: '<built-in method ...>' 형식
+        return funcname.strip('<>{}')
+    return f"{os.path.basename(filename)}:{funcname}:{lineno}".replace(';', ':')
+
+
+def _is_skipped(code):
+    if code.co_filename in _SKIPPED_FILES:
+        return True
+    # telemetry.traced()가 만든 wrapper 프레임
+    return code.co_name == 'wrapper' and code.co_filename == _TELEMETRY_FILE
+
+
+class StackSampler:
+    """대상 스레드의 호출 스택을 일정 간격으로 기록합니다."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.totals = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stage-profiler', daemon=True)
+
+    def _stack(self, frame):
+        names = []
+        while frame is not None and len(names) < MAX_STACK_DEPTH:
+            code = frame.f_code
+            if not _is_skipped(code):
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+                             .replace(';', ':'))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                key = self._stack(frame)
+                if key:
+                    self.totals[key] = self.totals.get(key, 0.0) + (now - last)
+            last = now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """['root;child;leaf 1234', ...] (값은 마이크로초)"""
+        return [
+            f"{key} {int(round(seconds * 1e6))}"
+            for key, seconds in sorted(self.totals.items())
+            if seconds * 1e6 >= 1
+        ]
+
+
+class PeakSnapshotter:
+    """tracemalloc 추적 메모리를 주기적으로 확인하여 가장 많았을 때의 스냅샷을 남깁니다."""
+
+    def __init__(self, interval=PEAK_POLL_INTERVAL):
+        self.interval = interval
+        self.snapshot = None
+        self._size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stage-profiler-peak', daemon=True)
+
+    def _check(self):
+        current = tracemalloc.get_traced_memory()[0]
+        if current > self._size * PEAK_SNAPSHOT_GROWTH:
+            self._size = current
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._check()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._check()
+
+
+def _ranked_lines(stats, key_index, title, top):
+    ordered = sorted(stats.stats.items(), key=lambda item: item[1][key_index], reverse=True)
+    lines = [title, f"{'rank':>4}  {'tottime':>10}  {'cumtime':>10}  {'ncalls':>10}  function"]
+    for rank, (func, (_, ncalls, tottime, cumtime, _)) in enumerate(ordered[:top], 1):
+        lines.append(f"{rank:>4}  {tottime:>10.4f}  {cumtime:>10.4f}  {ncalls:>10}  {_frame_name(func)}")
+    return lines
+
+
+def _allocation_lines(title, snapshot, baseline, top):
+    """baseline 대비 snapshot에서 늘어난 할당을 코드 위치별로 정리합니다."""
+    # 측정 도구 자체의 할당은 제외
+    filters = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    ]
+    differences = snapshot.filter_traces(filters).compare_to(baseline.filter_traces(filters), 'lineno')
+    differences = [stat for stat in differences if stat.size_diff > 0]
+
+    lines = [title, f"{'rank':>4}  {'size_kb':>10}  {'blocks':>8}  location"]
+    for rank, stat in enumerate(differences[:top], 1):
+        frame = stat.traceback[0]
+        lines.append(f"{rank:>4}  {stat.size_diff / 1024:>10.1f}  {stat.count_diff:>8}  "
+                     f"{os.path.basename(frame.filename)}:{frame.lineno}")
+    return lines
+
+
+def write_reports(name, output_dir, profiler, sampler, top=DEFAULT_TOP):
+    """
+    시간 프로파일 결과를 보고서와 collapsed stack 파일로 저장합니다.
+
+    Returns:
+        dict: {'report_path': str, 'collapsed_path': str}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    stats = pstats.Stats(profiler)
+
+    lines = [
+        f"Profile: {name}",
+        f"Total time: {stats.total_tt:.4f}s, function calls: {stats.total_calls}",
+        "",
+    ]
+    lines += _ranked_lines(stats, 2, "== Top functions by self time ==", top)
+    lines.append("")
+    lines += _ranked_lines(stats, 3, "== Top functions by cumulative time ==", top)
+
+    report_path = os.path.join(output_dir, f"{name}.profile.txt")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    collapsed_path = os.path.join(output_dir, f"{name}.collapsed")
+    with open(collapsed_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(sampler.collapsed()) + '\n')
+
+    return {'report_path': report_path, 'collapsed_path': collapsed_path}
+
+
+def write_memory_report(name, output_dir, baseline, peak_snapshot, end_snapshot, peak_bytes, top=DEFAULT_TOP):
+    """
+    메모리 프로파일 결과를 보고서로 저장합니다.
+
+    Args:
+        baseline / peak_snapshot / end_snapshot: 단계 시작, 최대 메모리 시점, 단계 종료 시점의
+            tracemalloc 스냅샷
+
+    Returns:
+        dict: {'report_path': str}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    lines = [
+        f"Memory profile: {name}",
+        f"Peak traced memory: {peak_bytes / (1024 * 1024):.2f} MB",
+        "",
+    ]
+    lines += _allocation_lines("== Top allocations by line at peak memory (vs. stage start) ==",
+                               peak_snapshot, baseline, top)
+    lines.append("")
+    lines += _allocation_lines("== Top allocations by line retained at end of stage (vs. stage start) ==",
+                               end_snapshot, baseline, top)
+
+    report_path = os.path.join(output_dir, f"{name}.memory.txt")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    return {'report_path': report_path}
+
+
+@contextlib.contextmanager
+def profile_stage(name, output_dir, top=DEFAULT_TOP):
+    """
+    블록 실행 시간을 cProfile + 스택 샘플링으로 측정하고 결과를 output_dir에 저장합니다.
+
+    Args:
+        name (str): 단계 이름 (출력 파일 이름에 사용)
+        output_dir (str): 결과 저장 디렉토리
+        top (int): 보고서에 표시할 순위 수
+    """
+    profiler = cProfile.Profile()
+    sampler = StackSampler(threading.get_ident())
+
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+
+        paths = write_reports(name, output_dir, profiler, sampler, top)
+        print(f"✓ 프로파일 보고서 저장: {paths['report_path']}", file=sys.stderr)
+        print(f"✓ collapsed stack 저장: {paths['collapsed_path']}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def profile_memory(name, output_dir, top=DEFAULT_TOP):
+    """
+    블록 실행 중 메모리 할당을 tracemalloc으로 측정하고 결과를 output_dir에 저장합니다.
+    최대 메모리 시점과 종료 시점에 단계 시작보다 늘어난 할당을 코드 위치별로 보고합니다.
+
+    Args:
+        name (str): 단계 이름 (출력 파일 이름에 사용)
+        output_dir (str): 결과 저장 디렉토리
+        top (int): 보고서에 표시할 순위 수
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+        tracemalloc.reset_peak()
+    baseline = tracemalloc.take_snapshot()
+    peak = PeakSnapshotter()
+
+    peak.start()
+    try:
+        yield
+    finally:
+        peak.stop()
+        end_snapshot = tracemalloc.take_snapshot()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        if not already_tracing:
+            tracemalloc.stop()
+
+        paths = write_memory_report(name, output_dir, baseline, peak.snapshot or end_snapshot,
+                                    end_snapshot, peak_bytes, top)
+        print(f"✓ 메모리 프로파일 보고서 저장: {paths['report_path']}", file=sys.stderr)
+
+
+def maybe_profile(enabled, name, output_dir, memory=False):
+    """
+    enabled가 True이면 profile_stage()를, memory가 True이면 profile_memory()를 적용합니다.
+    둘 다 켜면 시간 측정이 tracemalloc 부담으로 왜곡되므로 메모리 측정만 합니다.
+    """
+    if memory:
+        if enabled:
+            print("경고: --profile과 --profile-memory는 따로 실행하세요. 메모리만 측정합니다.", file=sys.stderr)
+        return profile_memory(name, output_dir)
+    if not enabled:
+        return contextlib.nullcontext()
+    return profile_stage(name, output_dir)
@@ -0,0 +1,365 @@
+"""파이프라인 스크립트 공용 계측 모듈 (span, counter, histogram)
+
+YT_KR_SUBTITLE_TRACE 환경 변수에 파일 경로를 지정하면 활성화됩니다.
+지정하지 않으면 span()은 아무 일도 하지 않는 공유 객체를 돌려주므로 오버헤드가 거의 없습니다.
+
+    export YT_KR_SUBTITLE_TRACE=projects/trace.jsonl
+    export YT_KR_SUBTITLE_TRACE_FORMAT=otlp       # 선택: OpenTelemetry OTLP/JSON 형식
+    export YT_KR_SUBTITLE_TRACE_ID=<32자리 hex>    # 선택: 여러 스크립트 실행을 하나의 trace로 묶기
+
+- jsonl (기본값): span이 끝날 때마다 한 줄씩 기록하고, 프로세스 종료 시 counter/histogram 요약을 기록합니다.
+- otlp: 프로세스 종료 시 ExportTraceServiceRequest / ExportMetricsServiceRequest JSON을 한 줄씩 기록합니다.
+  (OpenTelemetry Collector의 otlpjsonfile receiver로 읽을 수 있습니다.)
+
+사용 예:
+    import telemetry
+
+    @telemetry.traced('extract')
+    def extract_subtitle_text(subtitle_path):
+        ...
+        telemetry.current_span().set_attribute('cues', len(subs))
+    telemetry.count('cues.processed', len(subs), stage='group')
+    telemetry.observe('burn.output_mb', size_mb)
+
+    # 인자 계산에 비용이 드는 값(파일 크기 등)은 활성화 상태에서만 계산합니다.
+    if telemetry.enabled():
+        telemetry.count('bytes.read', os.path.getsize(path), stage='extract')
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import threading
+
+TRACE_ENV = 'YT_KR_SUBTITLE_TRACE'
+TRACE_FORMAT_ENV = 'YT_KR_SUBTITLE_TRACE_FORMAT'
+TRACE_ID_ENV = 'YT_KR_SUBTITLE_TRACE_ID'
+SERVICE_NAME = 'youtube-kr-subtitle'
+
+# span 소요 시간 히스토그램 구간 (ms)
+DURATION_BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 60000, 300000]
+
+
+class _NoopSpan:
+    """계측 비활성화 시 사용하는 빈 span"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """시작/종료 시각과 속성을 기록하는 구간"""
+
+    def __init__(self, telemetry, name, attributes):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = dict(attributes)
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = None
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def __enter__(self):
+        stack = self.telemetry._stack()
+        self.parent_id = stack[-1].span_id if stack else None
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        stack = self.telemetry._stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        self.telemetry._finish_span(self)
+        return False
+
+
+class _Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        index = len(self.bounds)
+        for i, upper in enumerate(self.bounds):
+            if value <= upper:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+
+class Telemetry:
+    """
+    span, counter, histogram을 모아 파일로 내보냅니다.
+
+    Args:
+        path (str): 출력 파일 경로 (추가 쓰기)
+        fmt (str): 'jsonl' 또는 'otlp'
+        trace_id (str): 32자리 hex trace ID (None이면 새로 생성)
+    """
+
+    def __init__(self, path, fmt='jsonl', trace_id=None):
+        self.path = path
+        self.fmt = fmt
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.script = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else 'python'
+        self.spans = []
+        self.counters = {}
+        self.histograms = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _write_lines(self, records):
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def _finish_span(self, span):
+        duration_ms = (span.end_ns - span.start_ns) / 1e6
+        self.observe('span.duration_ms', duration_ms, DURATION_BUCKETS_MS, span=span.name)
+
+        if self.fmt == 'otlp':
+            with self._lock:
+                self.spans.append(span)
+            return
+
+        self._write_lines([{
+            'type': 'span',
+            'trace_id': self.trace_id,
+            'span_id': span.span_id,
+            'parent_id': span.parent_id,
+            'name': span.name,
+            'script': self.script,
+            'start_ns': span.start_ns,
+            'end_ns': span.end_ns,
+            'duration_ms': round(duration_ms, 3),
+            'attributes': span.attributes,
+            'error': span.error,
+        }])
+
+    def count(self, name, value=1, **attributes):
+        key = (name, tuple(sorted(attributes.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, bounds=None, **attributes):
+        key = (name, tuple(sorted(attributes.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = _Histogram(bounds or DURATION_BUCKETS_MS)
+            histogram.record(value)
+
+    def flush(self):
+        """counter/histogram 요약(otlp 형식이면 span 포함)을 파일에 기록합니다."""
+        if self.fmt == 'otlp':
+            records = self._otlp_records()
+        else:
+            records = [
+                {'type': 'counter', 'trace_id': self.trace_id, 'script': self.script,
+                 'name': name, 'attributes': dict(attrs), 'value': value}
+                for (name, attrs), value in self.counters.items()
+            ] + [
+                {'type': 'histogram', 'trace_id': self.trace_id, 'script': self.script,
+                 'name': name, 'attributes': dict(attrs),
+                 'count': h.count, 'sum': round(h.sum, 3), 'min': h.min, 'max': h.max,
+                 'bounds': h.bounds, 'bucket_counts': h.counts}
+                for (name, attrs), h in self.histograms.items()
+            ]
+
+        if records:
+            self._write_lines(records)
+        self.spans = []
+        self.counters = {}
+        self.histograms = {}
+
+    # ------------------------------------------------------------------
+    # OpenTelemetry OTLP/JSON 형식
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _otlp_attributes(attributes):
+        converted = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                typed = {'boolValue': value}
+            elif isinstance(value, int):
+                typed = {'intValue': str(value)}
+            elif isinstance(value, float):
+                typed = {'doubleValue': value}
+            else:
+                typed = {'stringValue': str(value)}
+            converted.append({'key': key, 'value': typed})
+        return converted
+
+    def _otlp_records(self):
+        resource = {'attributes': self._otlp_attributes({
+            'service.name': SERVICE_NAME,
+            'process.command': self.script,
+        })}
+        scope = {'name': 'telemetry'}
+        now = str(time.time_ns())
+        records = []
+
+        if self.spans:
+            records.append({'resourceSpans': [{
+                'resource': resource,
+                'scopeSpans': [{
+                    'scope': scope,
+                    'spans': [{
+                        'traceId': self.trace_id,
+                        'spanId': span.span_id,
+                        'parentSpanId': span.parent_id or '',
+                        'name': span.name,
+                        'kind': 1,  # SPAN_KIND_INTERNAL
+                        'startTimeUnixNano': str(span.start_ns),
+                        'endTimeUnixNano': str(span.end_ns),
+                        'attributes': self._otlp_attributes(span.attributes),
+                        'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+                    } for span in self.spans],
+                }],
+            }]})
+
+        metrics = [{
+            'name': name,
+            'sum': {
+                'aggregationTemporality': 2,  # CUMULATIVE
+                'isMonotonic': True,
+                'dataPoints': [{'attributes': self._otlp_attributes(dict(attrs)),
+                                'timeUnixNano': now, 'asDouble': float(value)}],
+            },
+        } for (name, attrs), value in self.counters.items()] + [{
+            'name': name,
+            'histogram': {
+                'aggregationTemporality': 2,
+                'dataPoints': [{
+                    'attributes': self._otlp_attributes(dict(attrs)),
+                    'timeUnixNano': now,
+                    'count': str(h.count),
+                    'sum': h.sum,
+                    'min': h.min,
+                    'max': h.max,
+                    'explicitBounds': h.bounds,
+                    'bucketCounts': [str(c) for c in h.counts],
+                }],
+            },
+        } for (name, attrs), h in self.histograms.items()]
+
+        if metrics:
+            records.append({'resourceMetrics': [{
+                'resource': resource,
+                'scopeMetrics': [{'scope': scope, 'metrics': metrics}],
+            }]})
+        return records
+
+
+_telemetry = None
+
+
+def configure(path=None, fmt=None, trace_id=None):
+    """
+    계측을 활성화합니다. path가 없으면 YT_KR_SUBTITLE_TRACE 환경 변수를 사용하고,
+    둘 다 없으면 비활성화합니다.
+    """
+    global _telemetry
+    if _telemetry is not None:
+        _telemetry.flush()
+
+    path = path or os.environ.get(TRACE_ENV)
+    if not path:
+        _telemetry = None
+        return None
+
+    fmt = (fmt or os.environ.get(TRACE_FORMAT_ENV) or 'jsonl').lower()
+    if fmt not in ('jsonl', 'otlp'):
+        print(f"⚠ 알 수 없는 trace 형식 '{fmt}', jsonl로 기록합니다.", file=sys.stderr)
+        fmt = 'jsonl'
+    _telemetry = Telemetry(path, fmt, trace_id or os.environ.get(TRACE_ID_ENV))
+    return _telemetry
+
+
+def enabled():
+    return _telemetry is not None
+
+
+def span(name, **attributes):
+    """구간 측정 context manager. 비활성화 상태면 빈 span을 반환합니다."""
+    if _telemetry is None:
+        return _NOOP_SPAN
+    return Span(_telemetry, name, attributes)
+
+
+def current_span():
+    """현재 스레드에서 진행 중인 span (없거나 비활성화 상태면 빈 span)"""
+    if _telemetry is None:
+        return _NOOP_SPAN
+    stack = _telemetry._stack()
+    return stack[-1] if stack else _NOOP_SPAN
+
+
+def traced(name):
+    """함수 전체를 span으로 측정하는 decorator. 비활성화 상태면 함수만 호출합니다."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _telemetry is None:
+                return func(*args, **kwargs)
+            with Span(_telemetry, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1, **attributes):
+    """counter 값을 더합니다."""
+    if _telemetry is not None:
+        _telemetry.count(name, value, **attributes)
+
+
+def observe(name, value, bounds=None, **attributes):
+    """histogram에 값을 기록합니다."""
+    if _telemetry is not None:
+        _telemetry.observe(name, value, bounds, **attributes)
+
+
+def flush():
+    if _telemetry is not None:
+        _telemetry.flush()
+
+
+configure()
+atexit.register(flush)
@@ -0,0 +1,489 @@
+"""자막 텍스트를 번역 백엔드로 자동 번역하는 스크립트 (Quick Path)
+
+번역 백엔드는 TranslatorBackend를 상속하여 비동기 _translate_batch()를 구현합니다.
+- google: deep_translator.GoogleTranslator (텍스트마다 요청 하나)
+- mock: 네트워크 없이 지연 시간과 오류율을 흉내 내는 로컬 백엔드 (부하/장애 테스트용)
+
+모든 백엔드는 공유 토큰 버킷으로 실제 요청 수만큼 속도를 제한하고,
+백엔드별 지연 시간 히스토그램과 초당 처리 글자 수를 기록합니다.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import threading
+import argparse
+
+# 지연 시간 히스토그램 구간 (ms)
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class TranslationError(Exception):
+    """번역 백엔드 호출 실패"""
+
+
+class PartialTranslationError(TranslationError):
+    """
+    묶음의 일부 텍스트만 번역에 실패함
+
+    Attributes:
+        translations (list): 입력과 같은 길이, 실패한 항목은 None
+    """
+
+    def __init__(self, message, translations):
+        super().__init__(message)
+        self.translations = translations
+
+
+class TokenBucket:
+    """
+    여러 백엔드/작업이 공유하는 비동기 토큰 버킷.
+
+    Args:
+        rate (float): 초당 허용 요청 수
+        capacity (float): 순간적으로 허용할 최대 요청 수 (기본값: rate)
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"초당 요청 수는 0보다 커야 합니다: {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self, tokens=1):
+        # 이벤트 루프가 만들어진 뒤에 Lock을 생성합니다. (Python 3.7~3.9 호환)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class BackendMetrics:
+    """백엔드별 요청 수, 오류 수, 지연 시간 히스토그램, 처리량을 기록합니다."""
+
+    def __init__(self, name):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.texts = 0
+        self.chars = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.started = None
+        self.finished = None
+
+    def record(self, latency, texts, chars, error=False):
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now - latency
+        self.finished = now
+
+        self.requests += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+        latency_ms = latency * 1000
+        bucket = len(LATENCY_BUCKETS_MS)
+        for i, upper in enumerate(LATENCY_BUCKETS_MS):
+            if latency_ms <= upper:
+                bucket = i
+                break
+        self.histogram[bucket] += 1
+
+        if error:
+            self.errors += 1
+        else:
+            self.texts += texts
+            self.chars += chars
+
+    def to_dict(self):
+        elapsed = (self.finished - self.started) if self.started is not None else 0.0
+        labels = [f"<={upper}ms" for upper in LATENCY_BUCKETS_MS] + [f">{LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            'backend': self.name,
+            'requests': self.requests,
+            'errors': self.errors,
+            'texts': self.texts,
+            'chars': self.chars,
+            'elapsed_seconds': round(elapsed, 3),
+            'chars_per_second': round(self.chars / elapsed, 1) if elapsed > 0 else 0.0,
+            'latency_mean_ms': round(self.latency_sum / self.requests * 1000, 1) if self.requests else 0.0,
+            'latency_max_ms': round(self.latency_max * 1000, 1),
+            'latency_histogram': dict(zip(labels, self.histogram)),
+        }
+
+
+class TranslatorBackend:
+    """
+    번역 백엔드 기본 클래스. 하위 클래스는 _translate_batch()를 구현합니다.
+
+    Args:
+        source (str): 원문 언어 코드
+        target (str): 번역 대상 언어 코드
+        rate_limiter (TokenBucket): 공유 속도 제한기 (None이면 제한 없음)
+    """
+
+    name = 'base'
+    # True면 API가 텍스트마다 요청을 하나씩 보내므로, 텍스트 단위로 속도를 제한하고
+    # 실패한 텍스트만 PartialTranslationError로 알려 묶음 전체를 재시도하지 않게 합니다.
+    per_text_requests = False
+
+    def __init__(self, source='en', target='ko', rate_limiter=None):
+        self.source = source
+        self.target = target
+        self.rate_limiter = rate_limiter
+        self.metrics = BackendMetrics(f"{self.name}:{target}")
+
+    async def translate_batch(self, texts):
+        """
+        텍스트 묶음을 번역합니다. 실패하면 TranslationError를,
+        일부 텍스트만 실패하면 PartialTranslationError를 발생시킵니다.
+
+        Returns:
+            list: 입력과 같은 길이의 번역 문자열 리스트
+        """
+        if not self.per_text_requests:
+            return await self._request(texts)
+
+        translations = []
+        errors = []
+        for text in texts:
+            try:
+                translations.extend(await self._request([text]))
+            except TranslationError as e:
+                translations.append(None)
+                errors.append(e)
+        if errors:
+            raise PartialTranslationError(
+                f"{len(texts)}개 중 {len(errors)}개 실패: {errors[0]}", translations
+            )
+        return translations
+
+    async def _request(self, texts):
+        """요청 하나를 속도 제한 아래에서 보내고 지표를 기록합니다."""
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+
+        chars = sum(len(text) for text in texts)
+        started = time.monotonic()
+        try:
+            translated = await self._translate_batch(texts)
+            if len(translated) != len(texts):
+                raise TranslationError(
+                    f"번역 결과 개수 불일치: 입력 {len(texts)}개 vs 결과 {len(translated)}개"
+                )
+        except Exception as e:
+            self.metrics.record(time.monotonic() - started, len(texts), chars, error=True)
+            if isinstance(e, TranslationError):
+                raise
+            raise TranslationError(f"{self.name} 번역 실패: {e}") from e
+
+        self.metrics.record(time.monotonic() - started, len(texts), chars)
+        return translated
+
+    async def _translate_batch(self, texts):
+        raise NotImplementedError
+
+
+class GoogleTranslatorBackend(TranslatorBackend):
+    """deep_translator.GoogleTranslator를 사용하는 백엔드 (동기 호출을 스레드에서 실행)"""
+
+    name = 'google'
+    # deep_translator의 translate_batch()도 내부에서 텍스트마다 요청을 보냅니다.
+    per_text_requests = True
+
+    def __init__(self, source='en', target='ko', rate_limiter=None):
+        super().__init__(source, target, rate_limiter)
+        try:
+            from deep_translator import GoogleTranslator
+        except ImportError:
+            raise RuntimeError("deep-translator가 설치되어 있지 않습니다: pip install deep-translator")
+        self._translator_class = GoogleTranslator
+        # GoogleTranslator.translate()는 요청 파라미터를 인스턴스에 저장하므로
+        # 여러 executor 스레드가 한 인스턴스를 쓰면 서로의 텍스트가 섞입니다. 스레드마다 따로 만듭니다.
+        self._local = threading.local()
+        self._local.translator = GoogleTranslator(source=source, target=target)
+
+    def _translate_text(self, text):
+        translator = getattr(self._local, 'translator', None)
+        if translator is None:
+            translator = self._translator_class(source=self.source, target=self.target)
+            self._local.translator = translator
+        return translator.translate(text)
+
+    async def _translate_batch(self, texts):
+        loop = asyncio.get_running_loop()
+        return [
+            await loop.run_in_executor(None, self._translate_text, text)
+            for text in texts
+        ]
+
+
+class MockTranslatorBackend(TranslatorBackend):
+    """
+    네트워크 없이 동작하는 결정적 로컬 백엔드.
+
+    Args:
+        latency_ms (float): 요청당 평균 지연 시간
+        jitter_ms (float): 지연 시간 변동 폭 (±)
+        error_rate (float): 요청이 실패할 확률 (0.0~1.0)
+        seed (int): 난수 시드 (같은 시드면 같은 지연/오류 순서)
+    """
+
+    name = 'mock'
+
+    def __init__(self, source='en', target='ko', rate_limiter=None,
+                 latency_ms=200, jitter_ms=50, error_rate=0.0, seed=0):
+        super().__init__(source, target, rate_limiter)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    async def _translate_batch(self, texts):
+        delay_ms = self.latency_ms + self._random.uniform(-self.jitter_ms, self.jitter_ms)
+        fail = self._random.random() < self.error_rate
+        await asyncio.sleep(max(delay_ms, 0) / 1000)
+        if fail:
+            raise TranslationError("mock 백엔드 모의 오류")
+        return [f"[{self.target}] {text}" for text in texts]
+
+
+BACKENDS = {
+    'google': GoogleTranslatorBackend,
+    'mock': MockTranslatorBackend,
+}
+
+
+def create_backend(name, source='en', target='ko', rate_limiter=None, **options):
+    """이름으로 번역 백엔드를 생성합니다."""
+    if name not in BACKENDS:
+        raise ValueError(f"알 수 없는 번역 백엔드: {name} (사용 가능: {', '.join(BACKENDS)})")
+    return BACKENDS[name](source=source, target=target, rate_limiter=rate_limiter, **options)
+
+
+async def translate_texts(texts, backend, batch_size=20, concurrency=4,
+                          max_retries=2, retry_delay=0.5, prefilled=None):
+    """
+    자막 텍스트 리스트를 번역합니다.
+
+    빈 문자열과 prefilled(이미 번역된 항목)는 백엔드를 호출하지 않습니다.
+    재시도는 실패한 텍스트만 다시 보내며, 재시도 후에도 실패한 항목은 원문을 유지하고
+    failed_indices에 기록합니다.
+
+    Args:
+        texts (list): 원문 텍스트 리스트
+        backend (TranslatorBackend): 번역 백엔드
+        batch_size (int): 요청당 텍스트 수
+        concurrency (int): 동시에 진행할 요청 수
+        max_retries (int): 실패한 묶음의 재시도 횟수
+        retry_delay (float): 첫 재시도 대기 시간(초), 재시도마다 두 배
+        prefilled (list): 같은 길이의 리스트, None이 아닌 항목은 그대로 사용
+
+    Returns:
+        dict: {
+            'translations': [번역 문자열],
+            'failed_indices': [원문을 유지한 인덱스],
+            'metrics': dict
+        }
+    """
+    translations = list(texts)
+    pending = []
+    for i, text in enumerate(texts):
+        if prefilled is not None and prefilled[i] is not None:
+            translations[i] = prefilled[i]
+        elif text.strip():
+            pending.append(i)
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = []
+    done = [0]
+
+    async def run_batch(indices):
+        async with semaphore:
+            remaining = indices
+            for attempt in range(max_retries + 1):
+                error = None
+                try:
+                    result = await backend.translate_batch([texts[i] for i in remaining])
+                except PartialTranslationError as e:
+                    result, error = e.translations, e
+                except TranslationError as e:
+                    result, error = [None] * len(remaining), e
+
+                retry = []
+                for i, translated in zip(remaining, result):
+                    if translated is None:
+                        retry.append(i)
+                    else:
+                        translations[i] = translated
+                done[0] += len(remaining) - len(retry)
+                remaining = retry
+                if not remaining:
+                    break
+                if attempt == max_retries:
+                    print(f"⚠ {len(remaining)}개 항목 번역 실패, 원문 유지: {error}", file=sys.stderr)
+                    failed.extend(remaining)
+                    break
+                await asyncio.sleep(retry_delay * (2 ** attempt))
+
+            print(f"Progress: {done[0]}/{len(pending)}", file=sys.stderr)
+
+    await asyncio.gather(*(run_batch(indices) for indices in batches))
+
+    return {
+        'translations': translations,
+        'failed_indices': sorted(failed),
+        'metrics': backend.metrics.to_dict(),
+    }
+
+
+def partial_path_for(output_path):
+    """최종 번역 파일 경로에 대응하는 부분 번역 파일 경로 (translated_texts.partial.json)"""
+    root, _ = os.path.splitext(output_path)
+    return f"{root}.partial.json"
+
+
+def save_partial(partial_path, result):
+    """실패한 항목이 있는 번역 결과를 failed_indices와 함께 부분 번역 파일로 저장합니다."""
+    with open(partial_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'translations': result['translations'],
+            'failed_indices': result['failed_indices'],
+        }, f, ensure_ascii=False, indent=2)
+
+
+def load_partial(partial_path, count):
+    """
+    이전 실행의 부분 번역을 읽어 실패한 항목만 비운 prefilled 리스트를 만듭니다.
+
+    Returns:
+        list or None: 항목 수가 맞지 않거나 파일이 없으면 None
+    """
+    if not os.path.exists(partial_path):
+        return None
+    with open(partial_path, 'r', encoding='utf-8') as f:
+        partial = json.load(f)
+    prefilled = list(partial['translations'])
+    if len(prefilled) != count:
+        return None
+    for i in partial['failed_indices']:
+        prefilled[i] = None
+    return prefilled
+
+
+def _load_texts(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data['texts'] if isinstance(data, dict) else data
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="자막 텍스트 자동 번역")
+    parser.add_argument('input_json', help="subtitle_texts.json (extract_subtitle_text.py 결과)")
+    parser.add_argument('output_json', help="번역 결과를 저장할 translated_texts.json")
+    parser.add_argument('--backend', default='google', choices=sorted(BACKENDS))
+    parser.add_argument('--source', default='en')
+    parser.add_argument('--target', default='ko')
+    parser.add_argument('--rate', type=float, default=5.0, help="초당 최대 요청 수")
+    parser.add_argument('--batch-size', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--max-retries', type=int, default=2)
+    parser.add_argument('--prefill', help="segment_index.py apply 결과 (정확히 같은 구간의 저장된 번역만 재사용)")
+    parser.add_argument('--mock-latency-ms', type=float, default=200)
+    parser.add_argument('--mock-jitter-ms', type=float, default=50)
+    parser.add_argument('--mock-error-rate', type=float, default=0.0)
+    parser.add_argument('--mock-seed', type=int, default=0)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+
+    texts = _load_texts(args.input_json)
+    prefilled = None
+    if args.prefill:
+        with open(args.prefill, 'r', encoding='utf-8') as f:
+            prefill = json.load(f)
+        prefilled = prefill['translations']
+        # 비슷한 구간(fuzzy)의 번역 제안은 검토 전이므로 최종 번역으로 쓰지 않습니다.
+        for i, match in enumerate(prefill.get('matches') or []):
+            if match is not None and match.get('match') != 'exact':
+                prefilled[i] = None
+        if len(prefilled) != len(texts):
+            print("오류: prefill 항목 수가 자막 텍스트 수와 다릅니다.", file=sys.stderr)
+            sys.exit(1)
+
+    partial_path = partial_path_for(args.output_json)
+    previous = load_partial(partial_path, len(texts))
+    if previous is not None:
+        if prefilled is None:
+            prefilled = previous
+        else:
+            prefilled = [p if p is not None else q for p, q in zip(prefilled, previous)]
+        retry_count = sum(1 for text in prefilled if text is None)
+        print(f"✓ 이전 부분 번역 사용: 번역되지 않은 {retry_count}개 항목만 다시 번역합니다.", file=sys.stderr)
+
+    options = {}
+    if args.backend == 'mock':
+        options = {
+            'latency_ms': args.mock_latency_ms,
+            'jitter_ms': args.mock_jitter_ms,
+            'error_rate': args.mock_error_rate,
+            'seed': args.mock_seed,
+        }
+
+    try:
+        backend = create_backend(args.backend, args.source, args.target,
+                                 TokenBucket(args.rate), **options)
+    except (ValueError, RuntimeError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"번역 시작: {len(texts)}개 항목 ({args.backend}, {args.source} → {args.target})", file=sys.stderr)
+    result = asyncio.run(translate_texts(
+        texts, backend,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        max_retries=args.max_retries,
+        prefilled=prefilled,
+    ))
+
+    failed = result['failed_indices']
+    if failed:
+        # 실패한 항목에는 원문이 들어 있으므로 최종 번역 파일로 저장하지 않습니다.
+        save_partial(partial_path, result)
+        print(f"⚠ {len(failed)}개 항목 번역 실패, 부분 번역을 {partial_path}에 저장했습니다. "
+              f"같은 명령을 다시 실행하면 실패한 항목만 번역합니다.", file=sys.stderr)
+    else:
+        with open(args.output_json, 'w', encoding='utf-8') as f:
+            json.dump(result['translations'], f, ensure_ascii=False, indent=2)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        print(f"✓ 번역 결과 저장 완료: {args.output_json}", file=sys.stderr)
+
+    print(json.dumps({
+        'success': not failed,
+        'translated_count': len(result['translations']),
+        'failed_indices': failed,
+        'output_path': None if failed else args.output_json,
+        'partial_path': partial_path if failed else None,
+        'metrics': result['metrics'],
+    }, indent=2, ensure_ascii=False))
+    if failed:
+        sys.exit(1)
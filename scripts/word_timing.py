@@ -0,0 +1,312 @@
+"""YouTube 자동 자막의 단어 단위 타이밍을 읽고 자막 구간을 다시 나누는 스크립트
+
+SRT에는 자막 줄 단위 시간만 남지만, YouTube 자동 자막의 json3/VTT 형식에는
+단어마다 시작 시각이 들어 있습니다. 이 정보를 사용하면
+- 번역된 자막을 실제 발화 구간(첫 단어 시작 ~ 마지막 단어 끝)에 맞추고
+- 긴 번역문은 단어 시각을 경계로 삼아 짧은 자막 여러 개로 나눌 수 있습니다.
+
+WordTimeline은 단어 시작/끝 시각(ms)과 텍스트 오프셋을 array로 보관하며,
+모든 재분할은 단어 목록을 앞에서부터 한 번만 훑습니다.
+"""
+import re
+import sys
+import json
+import math
+import bisect
+from array import array
+
+DEFAULT_MAX_CHARS = 42
+DEFAULT_MAX_DURATION_MS = 6000
+DEFAULT_PAUSE_MS = 700
+SENTENCE_ENDINGS = ('.', '?', '!')
+
+_VTT_TIME = r'(?:(\d+):)?(\d{2}):(\d{2})\.(\d{3})'
+_VTT_CUE_RE = re.compile(_VTT_TIME + r'\s+-->\s+' + _VTT_TIME)
+_VTT_INLINE_RE = re.compile(r'<' + _VTT_TIME + r'>')
+_VTT_TAG_RE = re.compile(r'<[^>]*>')
+
+
+class WordTimeline:
+    """
+    단어 단위 타이밍 목록.
+
+    Attributes:
+        starts (array): 단어 시작 시각 (ms)
+        ends (array): 단어 끝 시각 (ms)
+        offsets (array): text 안에서 각 단어의 시작 위치 (마지막 원소는 text 길이)
+        text (str): 공백으로 이어 붙인 전체 단어
+    """
+
+    def __init__(self, words):
+        """
+        Args:
+            words (list): [(start_ms, end_ms, word), ...] (시작 시각 순)
+        """
+        self.starts = array('i')
+        self.ends = array('i')
+        self.offsets = array('i')
+        parts = []
+        position = 0
+        for start, end, word in words:
+            self.starts.append(start)
+            self.ends.append(max(end, start + 1))
+            self.offsets.append(position)
+            parts.append(word)
+            position += len(word) + 1
+        self.offsets.append(position)
+        self.text = ' '.join(parts)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def word(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1] - 1]
+
+    def words_between(self, start_ms, end_ms, lo=0):
+        """
+        start_ms <= 시작 시각 < end_ms 인 단어 범위 [lo, hi)를 반환합니다.
+        lo를 주면 그 위치부터 찾으므로 순서대로 호출하면 전체가 선형 시간입니다.
+        """
+        lo = bisect.bisect_left(self.starts, start_ms, lo)
+        hi = bisect.bisect_left(self.starts, end_ms, lo)
+        return lo, hi
+
+
+def _build_timeline(words):
+    """(start, event_end, word) 목록을 정렬하고 단어 끝 시각을 다음 단어 시작으로 제한합니다."""
+    words.sort(key=lambda w: w[0])
+    timed = []
+    for i, (start, event_end, word) in enumerate(words):
+        end = event_end
+        if i + 1 < len(words):
+            end = min(end, words[i + 1][0])
+        timed.append((start, end, word))
+    return WordTimeline(timed)
+
+
+def parse_json3(path):
+    """YouTube json3 자막 파일에서 단어 타이밍을 읽습니다."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    words = []
+    for event in data.get('events', []):
+        segs = event.get('segs')
+        if not segs or event.get('aAppend'):
+            continue
+        event_start = event.get('tStartMs', 0)
+        event_end = event_start + event.get('dDurationMs', 0)
+        for seg in segs:
+            text = seg.get('utf8', '').strip()
+            if not text:
+                continue
+            start = event_start + seg.get('tOffsetMs', 0)
+            # 한 seg에 여러 단어가 들어 있으면 같은 시작 시각을 공유합니다.
+            for word in text.split():
+                words.append((start, event_end, word))
+
+    return _build_timeline(words)
+
+
+def _vtt_ms(groups):
+    hours, minutes, seconds, millis = groups
+    return ((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)
+
+
+def parse_vtt(path):
+    """
+    VTT 자막 파일에서 단어 타이밍을 읽습니다.
+
+    YouTube 자동 자막 VTT는 '<00:00:01.520><c> word</c>' 형태의 단어 시각을 가지며,
+    이전 줄을 반복하는 줄(단어 시각 없음)은 건너뜁니다.
+    단어 시각이 전혀 없는 일반 VTT는 자막 구간 안에서 글자 수 비율로 시각을 나눕니다.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+
+    cues = []
+    current = None
+    for line in lines:
+        match = _VTT_CUE_RE.search(line)
+        if match:
+            current = {
+                'start': _vtt_ms(match.groups()[:4]),
+                'end': _vtt_ms(match.groups()[4:]),
+                'lines': [],
+            }
+            cues.append(current)
+        elif current is not None and line.strip():
+            current['lines'].append(line)
+        elif not line.strip():
+            current = None
+
+    has_inline = any(_VTT_INLINE_RE.search(line) for cue in cues for line in cue['lines'])
+
+    words = []
+    for cue in cues:
+        for line in cue['lines']:
+            if has_inline:
+                if not _VTT_INLINE_RE.search(line):
+                    continue
+                # 첫 단어는 자막 시작 시각, 이후 단어는 앞에 붙은 인라인 시각
+                pieces = _VTT_INLINE_RE.split(line)
+                first = _VTT_TAG_RE.sub('', pieces[0]).split()
+                words.extend((cue['start'], cue['end'], w) for w in first)
+                for i in range(1, len(pieces), 5):
+                    start = _vtt_ms(pieces[i:i + 4])
+                    text = _VTT_TAG_RE.sub('', pieces[i + 4])
+                    words.extend((start, cue['end'], w) for w in text.split())
+            else:
+                line_words = _VTT_TAG_RE.sub('', line).split()
+                total = sum(len(w) + 1 for w in line_words) or 1
+                span = cue['end'] - cue['start']
+                position = 0
+                for w in line_words:
+                    words.append((cue['start'] + span * position // total, cue['end'], w))
+                    position += len(w) + 1
+
+    return _build_timeline(words)
+
+
+def load_word_timing(path):
+    """확장자(.json3, .vtt)에 맞는 파서로 단어 타이밍을 읽습니다."""
+    if path.endswith('.json3'):
+        return parse_json3(path)
+    if path.endswith('.vtt'):
+        return parse_vtt(path)
+    raise ValueError(f"지원하지 않는 단어 타이밍 형식입니다: {path} (.json3 또는 .vtt)")
+
+
+def resegment(timeline, max_chars=DEFAULT_MAX_CHARS, max_duration_ms=DEFAULT_MAX_DURATION_MS,
+              pause_ms=DEFAULT_PAUSE_MS):
+    """
+    단어 목록을 한 번 훑어 자막 구간을 새로 나눕니다.
+    글자 수/길이 제한을 넘거나, 긴 쉼이 있거나, 문장이 끝나면 단어 시각에서 자릅니다.
+
+    Returns:
+        list: [(start_ms, end_ms, text), ...]
+    """
+    cues = []
+    first = None
+    length = 0
+    for i in range(len(timeline)):
+        word_length = timeline.offsets[i + 1] - timeline.offsets[i] - 1
+        if first is not None:
+            previous = timeline.word(i - 1)
+            if (length + 1 + word_length > max_chars or
+                    timeline.ends[i] - timeline.starts[first] > max_duration_ms or
+                    timeline.starts[i] - timeline.ends[i - 1] > pause_ms or
+                    previous.endswith(SENTENCE_ENDINGS)):
+                cues.append(_cue(timeline, first, i))
+                first = None
+        if first is None:
+            first, length = i, word_length
+        else:
+            length += 1 + word_length
+
+    if first is not None:
+        cues.append(_cue(timeline, first, len(timeline)))
+    return cues
+
+
+def _cue(timeline, lo, hi):
+    text = timeline.text[timeline.offsets[lo]:timeline.offsets[hi] - 1]
+    return (timeline.starts[lo], timeline.ends[hi - 1], text)
+
+
+def _split_text(text, pieces):
+    """번역문을 비슷한 길이의 pieces개 조각으로 나눕니다. 가능하면 공백에서 자릅니다."""
+    cuts = [0]
+    for k in range(1, pieces):
+        target = len(text) * k // pieces
+        window = max(1, len(text) // (pieces * 3))
+        candidates = [p for p in range(max(cuts[-1] + 1, target - window),
+                                       min(len(text), target + window + 1))
+                      if text[p] == ' ']
+        cut = min(candidates, key=lambda p: abs(p - target)) if candidates else target
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(len(text))
+    return [text[a:b].strip() for a, b in zip(cuts, cuts[1:]) if text[a:b].strip()]
+
+
+def retime_groups(timeline, spans, texts, max_chars=DEFAULT_MAX_CHARS):
+    """
+    그룹 자막의 시간을 단어 타이밍에 맞추고, 긴 번역문은 단어 시각에서 나눕니다.
+
+    - 그룹 시간은 그 안의 첫 단어 시작 ~ 마지막 단어 끝으로 좁힙니다.
+    - max_chars보다 긴 번역문은 여러 조각으로 나누고, 원문 단어의 글자 위치 비율에 맞는
+      단어 시작 시각을 조각 경계로 사용합니다.
+    - 안에 단어가 없는 그룹은 원래 시간을 그대로 사용합니다.
+
+    Args:
+        timeline (WordTimeline): 단어 타이밍
+        spans (list): [(start_ms, end_ms), ...] 그룹 자막 시간 (시간 순)
+        texts (list): 그룹별 번역문
+        max_chars (int): 자막 한 개의 최대 글자 수
+
+    Returns:
+        list: [(start_ms, end_ms, text), ...]
+    """
+    cues = []
+    cursor = 0
+    for (span_start, span_end), text in zip(spans, texts):
+        lo, hi = timeline.words_between(span_start, span_end, cursor)
+        cursor = hi
+        if lo == hi:
+            cues.append((span_start, span_end, text))
+            continue
+
+        start = timeline.starts[lo]
+        end = min(max(timeline.ends[hi - 1], start + 1), span_end)
+        pieces = _split_text(text, max(1, math.ceil(len(text) / max_chars)))
+        if len(pieces) <= 1 or hi - lo < len(pieces):
+            cues.append((start, end, text))
+            continue
+
+        # 조각 경계: 번역문 조각의 글자 비율과 가장 가까운 원문 단어의 시작 시각
+        base = timeline.offsets[lo]
+        source_length = timeline.offsets[hi] - base
+        total = sum(len(p) for p in pieces)
+        boundaries = [start]
+        consumed = 0
+        word = lo
+        for piece in pieces[:-1]:
+            consumed += len(piece)
+            target = base + source_length * consumed / total
+            # 조각마다 원문 단어가 하나 이상 남도록 경계 단어를 앞으로만 옮깁니다.
+            word += 1
+            while word + 1 < hi and timeline.offsets[word + 1] <= target:
+                word += 1
+            if word >= hi or timeline.starts[word] >= end:
+                break
+            boundaries.append(timeline.starts[word])
+        boundaries.append(end)
+
+        if len(boundaries) != len(pieces) + 1:
+            cues.append((start, end, text))
+            continue
+        for piece, piece_start, piece_end in zip(pieces, boundaries, boundaries[1:]):
+            cues.append((piece_start, max(piece_end, piece_start + 1), piece))
+
+    return cues
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python word_timing.py <json3_or_vtt> [max_chars]", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        timeline = load_word_timing(sys.argv[1])
+    except (OSError, ValueError) as e:
+        print(f"오류: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    max_chars = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_MAX_CHARS
+    cues = resegment(timeline, max_chars=max_chars)
+    print(f"✓ {len(timeline)}개 단어를 {len(cues)}개 자막으로 나눴습니다.", file=sys.stderr)
+    print(json.dumps({
+        'cues': [{'start_ms': s, 'end_ms': e, 'text': t} for s, e, t in cues],
+        'metadata': {'word_count': len(timeline), 'cue_count': len(cues)}
+    }, indent=2, ensure_ascii=False))